@@ -1,14 +1,29 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, send_file, stream_with_context, make_response, g
 import os
 import uuid
 import json
-from datetime import datetime
+import hashlib
+import hmac
+import time
+from datetime import datetime, timezone
 import io
-import pandas as pd
+import csv
+import click
 
 from database import Database
-from utils.scoring import AssessmentScorer
+from utils.scoring import scorer
 from utils.auth import check_supervisor_password
+from utils.sessions import SqliteSessionInterface
+from utils.exports import ExportJobs
+from utils.reports import ReportJobs, generate_reports
+from utils.imports import import_responses, read_rows
+from utils.backups import SnapshotScheduler, latest_snapshot, list_snapshots, restore_snapshot, take_snapshot
+from utils.cache import LRUCache
+from utils import charts
+from utils.write_behind import ResponseWriter
+from utils.metrics import metrics
+from utils.precompressed import PrecompressedPage
+from utils.static_assets import AssetManifest, build_assets, send_built_asset
 from assets.test_data import QUESTIONS
 
 app = Flask(__name__)
@@ -16,7 +31,6 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-i
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
 # Session configuration
-app.config['SESSION_TYPE'] = 'filesystem'
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_HTTPONLY'] = True
@@ -24,17 +38,130 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 # Initialize database
 db = Database()
 
+# Keep session data server-side; the cookie only carries an opaque ID
+app.session_interface = SqliteSessionInterface(db)
+
+# Optional write-behind mode: answers are queued and group-committed by a
+# background thread instead of each request committing its own
+response_writer = None
+if os.environ.get('WRITE_BEHIND', '').lower() in ('1', 'true', 'yes'):
+    response_writer = ResponseWriter(
+        db,
+        batch_size=int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 200)),
+        interval=int(os.environ.get('WRITE_BEHIND_INTERVAL_MS', 20)) / 1000)
+
+# Rendered /results pages, validated against the stored result on every hit
+results_cache = LRUCache(maxsize=int(os.environ.get('RESULTS_CACHE_SIZE', 2048)))
+
+# Online snapshots through the SQLite backup API, every BACKUP_INTERVAL_MINUTES
+# (0 disables the schedule; `flask backup` takes one on demand)
+snapshots = SnapshotScheduler(
+    db,
+    interval=int(os.environ.get('BACKUP_INTERVAL_MINUTES', 0)) * 60,
+    keep=int(os.environ.get('BACKUP_KEEP', 24)))
+
+# With READ_FROM_SNAPSHOT=1, exports and reports read the latest snapshot
+# instead of competing with participants for the live database
+_snapshot_dbs = LRUCache(maxsize=2)
+
+def read_db():
+    """Database for bulk read-only work: the newest snapshot, if enabled"""
+    if os.environ.get('READ_FROM_SNAPSHOT', '').lower() not in ('1', 'true', 'yes'):
+        return db
+    path = latest_snapshot(snapshots.directory)
+    if path is None:
+        return db
+    snapshot_db = _snapshot_dbs.get(path)
+    if snapshot_db is None:
+        snapshot_db = Database(path, read_only=True)
+        _snapshot_dbs.put(path, snapshot_db)
+    return snapshot_db
+
+# Excel exports run in background threads and are cached per data version
+export_jobs = ExportJobs(db, read_db=read_db)
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+report_jobs = ReportJobs(db, processes=int(os.environ.get('REPORT_PROCESSES', 0)) or None,
+                         read_db=read_db)
+
+QUESTION_IDS = {q['id'] for q in QUESTIONS}
+MAX_PAGE_SIZE = 500
+MAX_COHORT_SIZE = 5000
+MAX_CHART_SERIES = 8
+VALID_ANSWERS = ('A', 'B', 'C', 'D')
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def _start_snapshots():
+    snapshots.ensure_running()
+
+@app.after_request
+def _record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # The URL rule, not the path, so /results/<user_id> is one series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('http_request_duration_seconds',
+                        time.perf_counter() - start,
+                        (('route', route), ('method', request.method),
+                         ('status', str(response.status_code))))
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus metrics summed over every worker
+    
+    Scrapers send "Authorization: Bearer $METRICS_TOKEN"; a logged-in
+    supervisor can read them too.
+    """
+    token = os.environ.get('METRICS_TOKEN')
+    has_token = bool(token) and hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not (has_token or session.get('supervisor_authenticated')):
+        return jsonify({'error': 'Not authorized'}), 401
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Templates link assets through asset_url(), which resolves the fingerprinted
+# build from `flask build-assets` and falls back to the source file
+asset_manifest = AssetManifest(app)
+
+@app.template_global()
+def asset_url(filename):
+    return url_for('static', filename=asset_manifest.resolve(filename))
+
+@app.route('/static/dist/<path:filename>')
+def built_asset(filename):
+    """Build output: fingerprinted files are cached forever, precompressed if accepted"""
+    return send_built_asset(app.static_folder, filename, request)
+
+# Pages that are the same for every visitor, rendered once per process
+_prerendered_pages = {}
+
+def _prerendered(template, **context):
+    """Serve a visitor-independent template from memory, precompressed
+    
+    The page is rendered on first use and again whenever the template
+    sources change (checked on every hit in debug mode).
+    """
+    fingerprint = _template_fingerprint(template, 'base.html')
+    cached = _prerendered_pages.get(template)
+    if cached is None or cached[0] != fingerprint:
+        cached = (fingerprint, PrecompressedPage(render_template(template, **context)))
+        _prerendered_pages[template] = cached
+    return cached[1].respond(request)
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return _prerendered('index.html')
 
 @app.route('/assessment')
 def assessment():
-    # Clear any previous assessment data
-    session['current_question'] = 0
-    session['responses'] = {}
-    session['user_id'] = None
-    return render_template('assessment.html', questions=QUESTIONS)
+    # No per-visitor state here: /api/register starts each participant
+    # with a fresh session, so the page itself can be shared
+    return _prerendered('assessment.html', questions=QUESTIONS)
 
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -54,8 +181,6 @@ def register():
         # Clear and reinitialize session
         session.clear()
         session['user_id'] = str(user_id)
-        session['responses'] = {}
-        session['current_question'] = 1
         session.permanent = True  # Make session permanent
         session.modified = True  # Force session to save
         
@@ -78,93 +203,282 @@ def submit_answer():
         question_id = data.get('question_id')
         answer = data.get('answer', '').upper()
         
-        
-        if not answer or answer not in ['A', 'B', 'C', 'D']:
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Invalid question'}), 400
+        if question_id not in QUESTION_IDS:
+            return jsonify({'success': False, 'error': f'Invalid question {question_id}'}), 400
+        if not answer or answer not in VALID_ANSWERS:
             return jsonify({'success': False, 'error': 'Invalid answer'}), 400
         
-        # Save response to session
-        if 'responses' not in session:
-            session['responses'] = {}
-        session['responses'][str(question_id)] = answer
+        # Progress is kept in the database, not the session, so answering
+        # never rewrites the session row
+        answers = _answers_so_far(session['user_id'])
+        answers[question_id] = answer
         
-        # Force session to save
-        session.modified = True
+        # Save to database
+        if response_writer:
+            response_writer.submit(session['user_id'], question_id, answer)
+        else:
+            db.save_response(session['user_id'], question_id, answer)
         
+        return _finish_if_complete(answers)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/submit_answers', methods=['POST'])
+def submit_answers():
+    """Submit any number of answers in one request
+    
+    Accepts {"answers": {"1": "A", "2": "C", ...}} or
+    {"answers": [{"question_id": 1, "answer": "A"}, ...]}.
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({'success': False, 'error': 'Not registered'}), 401
         
-        # Save to database
-        db.save_response(session['user_id'], question_id, answer)
+        data = request.json or {}
+        answers = data.get('answers')
+        if isinstance(answers, dict):
+            answers = [{'question_id': k, 'answer': v} for k, v in answers.items()]
+        if not isinstance(answers, list) or not answers:
+            return jsonify({'success': False, 'error': 'No answers submitted'}), 400
         
-        # Check if all questions answered
-        if len(session['responses']) >= len(QUESTIONS):
-            # Calculate results
-            scorer = AssessmentScorer()
-            responses_dict = {int(k): v for k, v in session['responses'].items()}
-            
-            
-            # Get style scores
-            primary_style, secondary_style = scorer.calculate_style_scores(responses_dict)
-            adequacy_score, adequacy_tier = scorer.calculate_adequacy_score(responses_dict)
-            
-            
-            # Get all style scores
-            style_scores = scorer.get_all_style_scores([{'question_id': k, 'answer': v} 
-                                                        for k, v in responses_dict.items()])
+        # Validate everything before writing anything
+        batch = {}
+        for item in answers:
+            try:
+                question_id = int(item.get('question_id'))
+            except (AttributeError, TypeError, ValueError):
+                return jsonify({'success': False, 'error': 'Invalid question'}), 400
+            answer = str(item.get('answer', '')).upper()
             
-            
-            # Save results
-            db.save_results(
-                session['user_id'],
-                primary_style,
-                secondary_style,
-                adequacy_score,
-                adequacy_tier,
-                style_scores
-            )
-            
-            
-            return jsonify({
-                'success': True,
-                'completed': True,
-                'user_id': session['user_id']
-            })
+            if question_id not in QUESTION_IDS:
+                return jsonify({'success': False, 'error': f'Invalid question {question_id}'}), 400
+            if answer not in VALID_ANSWERS:
+                return jsonify({'success': False, 'error': f'Invalid answer for question {question_id}'}), 400
+            batch[question_id] = answer
+        
+        answers = _answers_so_far(session['user_id'])
+        answers.update(batch)
         
-        return jsonify({'success': True, 'completed': False})
+        # One transaction for the whole batch
+        if response_writer:
+            response_writer.submit_many(session['user_id'], batch.items())
+        else:
+            db.save_responses(session['user_id'], batch.items())
+        
+        return _finish_if_complete(answers)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _answers_so_far(user_id):
+    """{question_id: answer} already saved for the participant
+    
+    Answers this process still has queued are committed first; that only
+    happens when a participant's requests follow each other within the
+    write-behind interval.
+    """
+    if response_writer and response_writer.unsaved(user_id):
+        response_writer.flush()
+    return {r['question_id']: r['answer'] for r in db.get_user_responses(user_id)}
+
+def _finish_if_complete(answers):
+    """Score and save results once every question has an answer"""
+    if len(answers) >= len(QUESTIONS):
+        # Results must never exist for answers that are still queued
+        if response_writer:
+            response_writer.flush()
+        
+        # Calculate results
+        scores = scorer.score(answers)
+        
+        # Save results
+        db.save_results(
+            session['user_id'],
+            scores['primary_style'],
+            scores['secondary_style'],
+            scores['adequacy_score'],
+            scores['adequacy_level'],
+            scores['style_scores']
+        )
+        
+        return jsonify({
+            'success': True,
+            'completed': True,
+            'user_id': session['user_id']
+        })
+    
+    return jsonify({'success': True, 'completed': False})
+
 @app.route('/results/<user_id>')
 def results(user_id):
     """Display results for a user"""
     try:
-        result = db.get_user_results(user_id)
-        if not result:
+        version = db.get_result_version(user_id)
+        if not version:
+            _evict_results(user_id)
             return redirect(url_for('index'))
         
-        # Create chart data for Plotly
-        style_data = {
-            'labels': ['Directiv', 'Informativ', 'Participativ', 'Delegativ'],
-            'values': [
-                result['directiv_score'],
-                result['informativ_score'],
-                result['participativ_score'],
-                result['delegativ_score']
-            ]
-        }
-        
-        return render_template('results.html', 
-                             result=result,
-                             style_data=json.dumps(style_data))
+        # The chart is inline SVG; ?interactive=1 opts into the Plotly bundle
+        interactive = request.args.get('interactive') == '1'
+        
+        # Results only change through a rescore or deletion, both of which
+        # change the version, so a matching rendering can be reused
+        etag = _results_etag(user_id, version, interactive)
+        cached = results_cache.get((user_id, interactive))
+        if cached is None or cached[0] != etag:
+            result = db.get_user_results(user_id)
+            if not result:
+                _evict_results(user_id)
+                return redirect(url_for('index'))
+            
+            style_data = {
+                'labels': list(charts.STYLE_LABELS),
+                'values': charts.style_scores(result)
+            }
+            
+            body = render_template('results.html', 
+                                   result=result,
+                                   interactive=interactive,
+                                   style_chart=charts.donut_chart(
+                                       style_data['labels'], style_data['values'],
+                                       title='Distribuția procentuală a stilurilor'),
+                                   style_data=json.dumps(style_data))
+            cached = (etag, body)
+            results_cache.put((user_id, interactive), cached)
+        
+        response = make_response(cached[1])
+        response.set_etag(etag)
+        response.last_modified = _parse_timestamp(version[0])
+        # Personal data: browsers may keep it but must revalidate each time
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except Exception as e:
         return redirect(url_for('index'))
 
+@app.route('/results/<user_id>/chart.svg')
+def results_chart(user_id):
+    """Style scores of one participant as a bar chart"""
+    version = db.get_result_version(user_id)
+    if not version:
+        _evict_results(user_id)
+        return Response('Not found', status=404, mimetype='text/plain')
+    
+    etag = _results_etag(user_id, version, 'chart')
+    cached = results_cache.get((user_id, 'chart'))
+    if cached is None or cached[0] != etag:
+        result = db.get_user_results(user_id)
+        if not result:
+            return Response('Not found', status=404, mimetype='text/plain')
+        svg = charts.bar_chart(charts.STYLE_LABELS,
+                               [('Scor', charts.style_scores(result))],
+                               title='Distribuție Stiluri',
+                               colors=charts.STYLE_COLORS)
+        cached = (etag, str(svg))
+        results_cache.put((user_id, 'chart'), cached)
+    
+    response = Response(cached[1], mimetype='image/svg+xml')
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def _results_etag(user_id, version, variant=False):
+    digest = hashlib.sha1(
+        f"{_template_fingerprint('results.html', 'base.html')}|{user_id}|{variant}|{version!r}".encode('utf-8')
+    )
+    return digest.hexdigest()
+
+def _evict_results(user_id):
+    for variant in (False, True, 'chart'):
+        results_cache.pop((user_id, variant))
+
+_template_fingerprints = {}
+
+def _template_fingerprint(*names):
+    """Hash of the template sources, so a redeploy changes every ETag"""
+    if app.debug or names not in _template_fingerprints:
+        digest = hashlib.sha1()
+        for name in names:
+            source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, name)
+            digest.update(source.encode('utf-8'))
+        _template_fingerprints[names] = digest.hexdigest()[:12]
+    return _template_fingerprints[names]
+
+def _parse_timestamp(value):
+    """SQLite CURRENT_TIMESTAMP text (UTC) to an aware datetime, or None"""
+    try:
+        return datetime.fromisoformat(str(value)).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
 @app.route('/supervisor')
 def supervisor():
     """Supervisor dashboard"""
     if not session.get('supervisor_authenticated'):
         return render_template('supervisor_login.html')
     
-    results = db.get_all_results_with_responses()
-    return render_template('supervisor.html', results=results)
+    # The table itself is paged through /api/results
+    stats = db.get_cohort_stats()
+    return render_template('supervisor.html', total_results=stats['total'], stats=stats,
+                           max_cohort_size=MAX_COHORT_SIZE,
+                           max_chart_series=MAX_CHART_SERIES,
+                           interactive=request.args.get('interactive') == '1')
+
+@app.route('/api/stats')
+def cohort_stats():
+    """Cohort statistics from the incrementally maintained aggregates"""
+    if not session.get('supervisor_authenticated'):
+        return jsonify({'error': 'Not authorized'}), 401
+    
+    try:
+        return jsonify({'success': True, **db.get_cohort_stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/results')
+def results_page():
+    """Paged, sorted and filtered results (DataTables server-side protocol)
+    
+    Besides the DataTables parameters (draw, start, length, search[value],
+    order[0][column], order[0][dir], columns[i][data]) accepts optional
+    style and level filters.
+    """
+    if not session.get('supervisor_authenticated'):
+        return jsonify({'error': 'Not authorized'}), 401
+    
+    try:
+        args = request.args
+        offset = max(args.get('start', 0, type=int), 0)
+        limit = min(max(args.get('length', 25, type=int), 1), MAX_PAGE_SIZE)
+        
+        order_by = 'created_at'
+        column = args.get('order[0][column]', type=int)
+        if column is not None:
+            order_by = args.get(f'columns[{column}][data]', order_by)
+        descending = args.get('order[0][dir]', 'desc') != 'asc'
+        
+        total, filtered, rows = db.query_results(
+            offset=offset,
+            limit=limit,
+            order_by=order_by,
+            descending=descending,
+            search=args.get('search[value]', args.get('search', '')),
+            style=args.get('style') or None,
+            adequacy_level=args.get('level') or None
+        )
+        
+        return jsonify({
+            'draw': args.get('draw', 0, type=int),
+            'recordsTotal': total,
+            'recordsFiltered': filtered,
+            'data': rows
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/supervisor_login', methods=['POST'])
 def supervisor_login():
@@ -174,6 +488,8 @@ def supervisor_login():
         password = data.get('password', '')
         
         if check_supervisor_password(password):
+            # New session ID on privilege change (session fixation)
+            session.regenerate()
             session['supervisor_authenticated'] = True
             return jsonify({'success': True})
         
@@ -183,7 +499,7 @@ def supervisor_login():
 
 @app.route('/api/compare', methods=['POST'])
 def compare_profiles():
-    """Compare multiple user profiles"""
+    """Compare participant profiles, from a handful up to a whole cohort"""
     if not session.get('supervisor_authenticated'):
         return jsonify({'error': 'Not authorized'}), 401
     
@@ -191,28 +507,48 @@ def compare_profiles():
         data = request.json
         user_ids = data.get('user_ids', [])
         
-        if len(user_ids) < 2 or len(user_ids) > 4:
-            return jsonify({'error': 'Please select 2-4 participants'}), 400
+        if len(user_ids) < 2 or len(user_ids) > MAX_COHORT_SIZE:
+            return jsonify({'error': f'Please select 2-{MAX_COHORT_SIZE} participants'}), 400
         
-        comparison_data = []
-        for user_id in user_ids:
-            result = db.get_user_results(user_id)
-            if result:
-                comparison_data.append({
-                    'id': result['user_id'],
-                    'name': f"{result['first_name']} {result['last_name']}",
-                    'email': result['email'],
-                    'primary_style': result['primary_style'],
-                    'secondary_style': result['secondary_style'],
-                    'directiv_score': result['directiv_score'] or 0,
-                    'informativ_score': result['informativ_score'] or 0,
-                    'participativ_score': result['participativ_score'] or 0,
-                    'delegativ_score': result['delegativ_score'] or 0,
-                    'adequacy_score': result['adequacy_score'] or 0,
-                    'adequacy_level': result['adequacy_level']
-                })
-        
-        return jsonify({'success': True, 'data': comparison_data})
+        try:
+            clusters = int(data.get('clusters', 4))
+            neighbours = int(data.get('neighbours', 5))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'clusters and neighbours must be integers'}), 400
+        
+        # NumPy is only loaded once a supervisor actually compares profiles
+        from utils.cohort_analysis import ANSWER_QUESTION_IDS, analyze_cohort
+        
+        profiles = db.get_cohort_profiles(user_ids, ANSWER_QUESTION_IDS)
+        
+        comparison_data = [{
+            'id': result['user_id'],
+            'name': f"{result['first_name']} {result['last_name']}",
+            'email': result['email'],
+            'primary_style': result['primary_style'],
+            'secondary_style': result['secondary_style'],
+            'directiv_score': result['directiv_score'] or 0,
+            'informativ_score': result['informativ_score'] or 0,
+            'participativ_score': result['participativ_score'] or 0,
+            'delegativ_score': result['delegativ_score'] or 0,
+            'adequacy_score': result['adequacy_score'] or 0,
+            'adequacy_level': result['adequacy_level']
+        } for result in profiles]
+        
+        analysis = analyze_cohort(profiles,
+                                  clusters=max(1, min(clusters, 20)),
+                                  neighbours=max(0, min(neighbours, 20))) if profiles else None
+        
+        # Grouped bars stop being readable beyond a handful of participants
+        chart = None
+        if len(comparison_data) <= MAX_CHART_SERIES:
+            chart = str(charts.bar_chart(
+                charts.STYLE_LABELS,
+                [(user['name'], charts.style_scores(user)) for user in comparison_data],
+                title='Comparație Stiluri de Management'))
+        
+        return jsonify({'success': True, 'data': comparison_data, 'analysis': analysis,
+                        'chart': chart})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -224,43 +560,37 @@ def export_data(format):
         return jsonify({'error': 'Not authorized'}), 401
     
     try:
-        results = db.get_all_results()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(results)
-        
-        # Select relevant columns
-        columns = ['first_name', 'last_name', 'email', 'primary_style', 
-                  'secondary_style', 'adequacy_score', 'adequacy_level',
-                  'directiv_score', 'informativ_score', 'participativ_score', 
-                  'delegativ_score', 'created_at']
-        
-        df = df[columns]
-        
-        # Create file in memory
-        output = io.BytesIO()
+        filters = _export_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         if format == 'excel':
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df.to_excel(writer, sheet_name='Results', index=False)
-            output.seek(0)
-            
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name=f'assessment_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-            )
+            # Served from the cache when the data hasn't changed; otherwise
+            # the workbook is built by a background job the client polls
+            path = export_jobs.cached_file(filters)
+            if path:
+                return send_file(
+                    path,
+                    mimetype=XLSX_MIMETYPE,
+                    as_attachment=True,
+                    download_name=f'assessment_results_{timestamp}.xlsx'
+                )
+            job_id = export_jobs.start(filters)
+            status_url = url_for('export_job_status', job_id=job_id)
+            return (jsonify({'success': True, 'status_url': status_url,
+                             **_export_job_status(job_id)}),
+                    202, {'Location': status_url})
         
         elif format == 'csv':
-            df.to_csv(output, index=False)
-            output.seek(0)
-            
-            return send_file(
-                output,
+            return Response(
+                stream_with_context(_stream_csv(read_db().iter_export_rows(**filters))),
                 mimetype='text/csv',
-                as_attachment=True,
-                download_name=f'assessment_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+                headers={
+                    'Content-Disposition': f'attachment; filename=assessment_results_{timestamp}.csv'
+                }
             )
         
         return jsonify({'error': 'Invalid format'}), 400
@@ -268,6 +598,157 @@ def export_data(format):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/export_jobs', methods=['POST'])
+def start_export_job():
+    """Start a background Excel export"""
+    if not session.get('supervisor_authenticated'):
+        return jsonify({'error': 'Not authorized'}), 401
+    
+    try:
+        filters = _export_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        job_id = export_jobs.start(filters)
+        return jsonify({'success': True, **_export_job_status(job_id)}), 202
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/export_jobs/<job_id>')
+def export_job_status(job_id):
+    """Poll a background export"""
+    if not session.get('supervisor_authenticated'):
+        return jsonify({'error': 'Not authorized'}), 401
+    
+    status = _export_job_status(job_id)
+    if status is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, **status})
+
+@app.route('/api/export_jobs/<job_id>/download')
+def download_export_job(job_id):
+    """Download a finished export"""
+    if not session.get('supervisor_authenticated'):
+        return jsonify({'error': 'Not authorized'}), 401
+    
+    job = db.get_export_job(job_id)
+    if not job or job['status'] != 'done' or not os.path.exists(job['file_path'] or ''):
+        return jsonify({'success': False, 'error': 'Export not available'}), 404
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Report jobs share the job table and produce zip archives
+    if job['file_path'].endswith('.zip'):
+        return send_file(
+            job['file_path'],
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name=f'assessment_reports_{timestamp}.zip'
+        )
+    
+    return send_file(
+        job['file_path'],
+        mimetype=XLSX_MIMETYPE,
+        as_attachment=True,
+        download_name=f'assessment_results_{timestamp}.xlsx'
+    )
+
+@app.route('/api/report_jobs', methods=['POST'])
+def start_report_job():
+    """Start generating individual reports, for the given participants or
+    everyone matching the export filters"""
+    if not session.get('supervisor_authenticated'):
+        return jsonify({'error': 'Not authorized'}), 401
+    
+    try:
+        filters = _export_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    data = request.get_json(silent=True) or {}
+    user_ids = data.get('user_ids') or None
+    if user_ids is not None and not isinstance(user_ids, list):
+        return jsonify({'error': 'user_ids must be a list'}), 400
+    
+    try:
+        job_id = report_jobs.start(user_ids=user_ids, filters=filters)
+        return jsonify({'success': True, **_export_job_status(job_id)}), 202
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _export_job_status(job_id):
+    job = db.get_export_job(job_id)
+    if not job:
+        return None
+    status = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'total': job['total']
+    }
+    if job['status'] == 'done':
+        status['download_url'] = url_for('download_export_job', job_id=job['id'])
+    elif job['status'] == 'failed':
+        status['error'] = job['error']
+    return status
+
+def _export_filters(args):
+    """Read optional export filters (from, to, style, level) from the query string"""
+    filters = {}
+    for arg, key in (('from', 'date_from'), ('to', 'date_to')):
+        value = args.get(arg, '').strip()
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"Invalid '{arg}' date, expected YYYY-MM-DD")
+            filters[key] = value
+    if args.get('style'):
+        filters['style'] = args['style'].strip()
+    if args.get('level'):
+        filters['adequacy_level'] = args['level'].strip()
+    return filters
+
+def _stream_csv(chunks):
+    """Yield encoded CSV, one block per database chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    
+    writer.writerow(Database.EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    
+    # Header only, when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+@app.route('/api/import', methods=['POST'])
+def import_data():
+    """Import completed paper questionnaires from an uploaded CSV or XLSX"""
+    if not session.get('supervisor_authenticated'):
+        return jsonify({'error': 'Not authorized'}), 401
+    
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    try:
+        summary = import_responses(db, read_rows(upload.stream, upload.filename))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'imported': summary['imported'],
+        'failed': summary['failed'],
+        'errors': [{'row': line, 'error': message} for line, message in summary['errors']]
+    })
+
 @app.route('/api/delete_user/<user_id>', methods=['DELETE'])
 def delete_user(user_id):
     """Delete a user and all associated data"""
@@ -275,7 +756,12 @@ def delete_user(user_id):
         return jsonify({'error': 'Not authorized'}), 401
     
     try:
+        # Commit this worker's queued answers first; answers still queued in
+        # other workers are skipped once the user row is gone
+        if response_writer:
+            response_writer.flush()
         success = db.delete_user_completely(user_id)
+        _evict_results(user_id)
         if success:
             return jsonify({'success': True})
         else:
@@ -297,6 +783,131 @@ def not_found(e):
 def server_error(e):
     return render_template('500.html'), 500
 
+@app.cli.command('rescore')
+@click.option('--chunk-size', default=50000, show_default=True,
+              help='Participants scored and written per transaction')
+def rescore_command(chunk_size):
+    """Recompute every stored result from the saved responses"""
+    from utils.batch_scoring import rescore_database
+    
+    scanned, changed = rescore_database(
+        db, chunk_size,
+        progress=lambda done: click.echo(f"Rescored {done} participants")
+    )
+    click.echo(f"✅ Rescore complete: {changed} results updated ({scanned} scanned)")
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the cohort statistics from results and report any drift"""
+    drift = db.rebuild_cohort_stats()
+    for dimension, bucket, stored, expected in drift:
+        click.echo(f"Drift in {dimension}/{bucket or '-'}: stored {stored}, expected {expected}")
+    if drift:
+        click.echo(f"⚠️  Rebuilt cohort statistics, {len(drift)} buckets had drifted")
+    else:
+        click.echo("✅ Cohort statistics rebuilt, no drift found")
+
+@app.cli.command('build-reports')
+@click.argument('output', type=click.Path(dir_okay=False))
+@click.option('--user-id', 'user_ids', multiple=True,
+              help='Participant to include; repeat for several (default: all)')
+@click.option('--from', 'date_from', help='First result date, YYYY-MM-DD')
+@click.option('--to', 'date_to', help='Last result date, YYYY-MM-DD')
+@click.option('--style', help='Primary style')
+@click.option('--level', 'adequacy_level', help='Adequacy level')
+@click.option('--processes', default=0, help='Worker processes (default: one per CPU)')
+@click.option('--chunk-size', default=100, show_default=True,
+              help='Reports rendered per work unit')
+def build_reports_command(output, user_ids, date_from, date_to, style, adequacy_level,
+                          processes, chunk_size):
+    """Render an HTML report per participant into a zip archive"""
+    filters = {key: value for key, value in (('date_from', date_from), ('date_to', date_to),
+                                             ('style', style),
+                                             ('adequacy_level', adequacy_level)) if value}
+    start = time.perf_counter()
+    total = generate_reports(
+        db, output, user_ids=list(user_ids) or None, filters=filters,
+        processes=processes or None, chunk_size=chunk_size,
+        progress=lambda done: click.echo(f"Rendered {done} reports")
+    )
+    click.echo(f"✅ Wrote {total} reports to {output} in {time.perf_counter() - start:.1f}s")
+
+@app.cli.command('import-responses')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=5000, show_default=True,
+              help='Participants scored and written per transaction')
+def import_responses_command(path, chunk_size):
+    """Import completed questionnaires from a CSV or XLSX file"""
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        summary = import_responses(
+            db, read_rows(f, path), chunk_size,
+            progress=lambda done: click.echo(f"Imported {done} participants")
+        )
+    for line, message in summary['errors']:
+        click.echo(f"Row {line}: {message}")
+    if summary['failed'] > len(summary['errors']):
+        click.echo(f"... and {summary['failed'] - len(summary['errors'])} more invalid rows")
+    click.echo(f"✅ Imported {summary['imported']} participants in "
+               f"{time.perf_counter() - start:.1f}s, {summary['failed']} rows skipped")
+
+@app.cli.command('backup')
+@click.option('--keep', default=None, type=int,
+              help='Snapshots to keep (default: BACKUP_KEEP or 24)')
+def backup_command(keep):
+    """Take a snapshot of the live database and prune old ones"""
+    start = time.perf_counter()
+    path = take_snapshot(db.db_path, snapshots.directory, keep or snapshots.keep)
+    click.echo(f"✅ Snapshot written to {path} "
+               f"({os.path.getsize(path) / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s)")
+
+@app.cli.command('restore')
+@click.argument('snapshot', required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation')
+def restore_command(snapshot, yes):
+    """Replace the live database with a snapshot (default: the newest)"""
+    snapshot = snapshot or latest_snapshot(snapshots.directory)
+    if snapshot is None:
+        raise click.ClickException(f"No snapshots in {snapshots.directory}")
+    if not yes:
+        click.confirm(f"Replace {db.db_path} with {snapshot}?", abort=True)
+    
+    # The current state is kept as a snapshot of its own first
+    safety = take_snapshot(db.db_path, snapshots.directory)
+    restore_snapshot(snapshot, db.db_path)
+    click.echo(f"Previous contents saved to {safety}")
+    click.echo(f"✅ Restored {db.db_path} from {snapshot}")
+
+@app.cli.command('migrate-answers')
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation')
+def migrate_answers_command(yes):
+    """Pack the legacy responses table into answer_sets (snapshot first)"""
+    if not db.has_legacy_responses():
+        click.echo("✅ No legacy responses table; nothing to migrate")
+        return
+    if not yes:
+        click.confirm(f"Migrate and drop the responses table in {db.db_path}?", abort=True)
+    
+    # The migration drops the old table, so the current state is kept first
+    safety = take_snapshot(db.db_path, snapshots.directory)
+    click.echo(f"Snapshot of the current database saved to {safety}")
+    migrated = db.migrate_responses_to_answer_sets()
+    click.echo(f"✅ Packed answers for {migrated or 0} participants")
+
+@app.cli.command('snapshots')
+def snapshots_command():
+    """List the available snapshots, newest first"""
+    for path in list_snapshots(snapshots.directory):
+        click.echo(f"{path}  {os.path.getsize(path) / 1e6:.1f} MB")
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Minify, fingerprint and precompress the files under static/"""
+    manifest = build_assets(app.static_folder)
+    for source, built in sorted(manifest.items()):
+        click.echo(f"{source} -> {built}")
+    click.echo(f"✅ Built {len(manifest)} assets")
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
     app.run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
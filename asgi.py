@@ -0,0 +1,27 @@
+"""ASGI entry point, alongside wsgi.py:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5001
+    gunicorn -k uvicorn.workers.UvicornWorker -w 2 asgi:application
+
+Connections are held by the event loop, so one process keeps thousands of
+participants in flight; requests run in a pool of ASGI_THREADS threads.
+Answers go through the write-behind queue, whose single writer thread
+commits them in batches, and answering does not touch the session row, so
+answer requests do not queue on SQLite's write lock. Registration, the
+session it creates and the final results are still written synchronously.
+Each worker has its own queue; answers a worker still holds for a deleted
+participant are skipped when they are written.
+"""
+import os
+
+# Async mode defaults to the write-behind queue; WRITE_BEHIND=0 turns it off
+os.environ.setdefault('WRITE_BEHIND', '1')
+
+from app import app, response_writer  # noqa: E402
+from utils.asgi_bridge import WsgiToAsgi  # noqa: E402
+
+application = WsgiToAsgi(
+    app,
+    max_threads=int(os.environ.get('ASGI_THREADS', 32)),
+    # Commit queued answers before the worker exits
+    on_shutdown=[response_writer.close] if response_writer else [])
@@ -0,0 +1,78 @@
+"""Fail when importing the WSGI app gets slower or heavier than its budget.
+
+Runs ``python -X importtime -c "import wsgi"`` in fresh interpreters and
+compares the median cumulative import time and the peak RSS against the
+budget. Exits non-zero when either is exceeded; tests/test_import_budget.py
+runs the same measurement as part of the test suite:
+
+    python benchmarks/import_budget.py --max-ms 400 --max-rss-mb 60
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Printed by the child after the import so RSS covers everything it loaded
+CHILD = (
+    "import resource, wsgi; "
+    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+
+
+def measure_once(env):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    import_us = None
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) == 3 and parts[2] == 'wsgi':
+            import_us = int(parts[1])
+    if import_us is None:
+        raise RuntimeError(f"wsgi not found in -X importtime output:\n{proc.stderr}")
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = int(proc.stdout.strip().splitlines()[-1])
+    rss_mb = rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+    return import_us / 1000, rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-ms', type=float, default=400,
+                        help='Budget for the median import time of wsgi (ms)')
+    parser.add_argument('--max-rss-mb', type=float, default=60,
+                        help='Budget for peak RSS after importing wsgi (MB)')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_PATH=os.path.join(tmp, 'budget.db'))
+        # First run warms the bytecode cache and is discarded
+        measure_once(env)
+        samples = [measure_once(env) for _ in range(args.runs)]
+
+    import_ms = statistics.median(s[0] for s in samples)
+    rss_mb = max(s[1] for s in samples)
+    print(f"wsgi import: {import_ms:.0f} ms (budget {args.max_ms:.0f} ms)")
+    print(f"peak RSS:    {rss_mb:.1f} MB (budget {args.max_rss_mb:.0f} MB)")
+
+    failed = False
+    if import_ms > args.max_ms:
+        print("❌ Import time over budget")
+        failed = True
+    if rss_mb > args.max_rss_mb:
+        print("❌ RSS over budget")
+        failed = True
+    if not failed:
+        print("✅ Within budget")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
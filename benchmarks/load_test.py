@@ -0,0 +1,315 @@
+"""End-to-end load test: concurrent participants plus supervisor traffic.
+
+Starts ``gunicorn --workers 2 wsgi:app`` on a temporary database (or, with
+--server asgi, gunicorn with uvicorn workers serving asgi:application; or
+targets an already running server with --url), then runs N virtual participants
+through the real flow -- register, 12 answers, results page -- while M
+virtual supervisors poll the dashboard and download the CSV export.
+Reports throughput, p50/p95/p99 latency per endpoint and the error rate,
+counting "database is locked" failures separately:
+
+    python benchmarks/load_test.py --users 200 --concurrency 50 --save baseline.json
+    python benchmarks/load_test.py --users 200 --concurrency 50 --compare baseline.json
+    python benchmarks/load_test.py --server asgi --workers 1 --users 2000 --concurrency 1000
+
+Reports recorded on the reference machine are kept under benchmarks/baselines/.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUPERVISOR_PASSWORD = 'load-test'
+QUESTION_COUNT = 12
+# Endpoints with fewer requests than this are not compared to the baseline
+MIN_COMPARE_SAMPLES = 50
+
+
+class Recorder:
+    """Thread-safe latency and error collection, grouped by endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.locked = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok, body=b''):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+                if b'database is locked' in body:
+                    self.locked[endpoint] += 1
+
+
+class Client:
+    """One virtual user: its own cookie jar, every request timed"""
+
+    def __init__(self, base_url, recorder, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, endpoint, path, payload=None):
+        data = None
+        headers = {}
+        if payload is not None:
+            data = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data,
+                                     headers=headers)
+
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                body = resp.read()
+                ok = resp.status < 400
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            ok = False
+        except (urllib.error.URLError, OSError) as e:
+            body = str(e).encode('utf-8')
+            ok = False
+        self.recorder.record(endpoint, time.perf_counter() - start, ok, body)
+        return ok, body
+
+
+def participant(base_url, recorder, timeout, index):
+    client = Client(base_url, recorder, timeout)
+    ok, body = client.request('POST /api/register', '/api/register', {
+        'first_name': 'Load',
+        'last_name': f'Test {index}',
+        'email': f'load{index}@example.com'
+    })
+    if not ok:
+        return
+    user_id = json.loads(body)['user_id']
+
+    for question_id in range(1, QUESTION_COUNT + 1):
+        client.request('POST /api/submit_answer', '/api/submit_answer', {
+            'question_id': question_id,
+            'answer': random.choice('ABCD')
+        })
+
+    client.request('GET /results/<id>', f'/results/{user_id}')
+
+
+def supervisor(base_url, recorder, timeout, stop, pause):
+    client = Client(base_url, recorder, timeout)
+    ok, _ = client.request('POST /api/supervisor_login', '/api/supervisor_login',
+                           {'password': SUPERVISOR_PASSWORD})
+    if not ok:
+        return
+    while not stop.is_set():
+        client.request('GET /supervisor', '/supervisor')
+        client.request('GET /api/export/csv', '/api/export/csv')
+        stop.wait(pause)
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1,
+                       int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    total_requests = total_errors = total_locked = 0
+    for endpoint, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        errors = recorder.errors[endpoint]
+        endpoints[endpoint] = {
+            'requests': len(values),
+            'errors': errors,
+            'locked': recorder.locked[endpoint],
+            'throughput_rps': round(len(values) / elapsed, 2),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        }
+        total_requests += len(values)
+        total_errors += errors
+        total_locked += recorder.locked[endpoint]
+
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'requests': total_requests,
+        'throughput_rps': round(total_requests / elapsed, 2) if elapsed else 0,
+        'error_rate': round(total_errors / total_requests, 4) if total_requests else 0,
+        'locked_errors': total_locked,
+        'endpoints': endpoints,
+    }
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['elapsed_s']} s "
+          f"({report['throughput_rps']} req/s), error rate "
+          f"{report['error_rate']:.2%}, 'database is locked': {report['locked_errors']}")
+    print(f"{'endpoint':<28}{'reqs':>7}{'errors':>8}{'req/s':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:<28}{stats['requests']:>7}{stats['errors']:>8}"
+              f"{stats['throughput_rps']:>9}{stats['p50_ms']:>9}"
+              f"{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+
+
+def compare(report, baseline, tolerance):
+    """Print p99 changes against a baseline; True if anything regressed"""
+    regressed = False
+    print(f"\nCompared with baseline ({tolerance:.0f}% tolerance):")
+    for endpoint, stats in report['endpoints'].items():
+        old = baseline['endpoints'].get(endpoint)
+        # A p99 over a handful of requests is just its slowest sample
+        if (not old or not old['p99_ms'] or stats['requests'] < MIN_COMPARE_SAMPLES
+                or old['requests'] < MIN_COMPARE_SAMPLES):
+            continue
+        change = (stats['p99_ms'] - old['p99_ms']) / old['p99_ms'] * 100
+        flag = ''
+        if change > tolerance:
+            flag = '  ❌ slower'
+            regressed = True
+        print(f"  {endpoint:<28} p99 {old['p99_ms']:>8} -> {stats['p99_ms']:>8} ms "
+              f"({change:+.0f}%){flag}")
+    if report['error_rate'] > baseline['error_rate']:
+        print(f"  error rate {baseline['error_rate']:.2%} -> {report['error_rate']:.2%}  ❌")
+        regressed = True
+    return regressed
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+SERVERS = {
+    'wsgi': ['wsgi:app'],
+    'asgi': ['--worker-class', 'uvicorn.workers.UvicornWorker', 'asgi:application'],
+}
+
+
+def start_server(workers, db_path, server='wsgi'):
+    port = free_port()
+    env = dict(os.environ,
+               DATABASE_PATH=db_path,
+               SUPERVISOR_PASSWORD=SUPERVISOR_PASSWORD,
+               SECRET_KEY='load-test')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+         '--backlog', '4096', *SERVERS[server]],
+        cwd=ROOT, env=env)
+    base_url = f'http://127.0.0.1:{port}'
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError('gunicorn exited during start-up')
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=1).read()
+            return proc, base_url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError('gunicorn did not start within 30 s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100,
+                        help='Participants to run through the assessment')
+    parser.add_argument('--concurrency', type=int, default=20,
+                        help='Participants active at the same time')
+    parser.add_argument('--supervisors', type=int, default=1,
+                        help='Supervisors polling the dashboard and CSV export')
+    parser.add_argument('--supervisor-pause', type=float, default=1.0,
+                        help='Seconds between supervisor polls')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='gunicorn workers for the local server')
+    parser.add_argument('--server', choices=sorted(SERVERS), default='wsgi',
+                        help='Entry point for the local server')
+    parser.add_argument('--url', help='Target a running server instead '
+                        '(its SUPERVISOR_PASSWORD must be "load-test")')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--save', help='Write the report to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=25,
+                        help='Allowed p99 slowdown against the baseline (%%)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        base_url = args.url
+        if not base_url:
+            server, base_url = start_server(args.workers,
+                                            os.path.join(tmp, 'load.db'),
+                                            args.server)
+        try:
+            recorder = Recorder()
+            stop = threading.Event()
+            supervisors = [
+                threading.Thread(target=supervisor,
+                                 args=(base_url, recorder, args.timeout, stop,
+                                       args.supervisor_pause))
+                for _ in range(args.supervisors)
+            ]
+
+            start = time.perf_counter()
+            for thread in supervisors:
+                thread.start()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                list(pool.map(
+                    lambda i: participant(base_url, recorder, args.timeout, i),
+                    range(args.users)))
+            stop.set()
+            for thread in supervisors:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    report = summarize(recorder, elapsed)
+    report['config'] = {
+        'users': args.users,
+        'concurrency': args.concurrency,
+        'supervisors': args.supervisors,
+        'server': args.server if not args.url else None,
+        'workers': args.workers if not args.url else None,
+        'python': platform.python_version(),
+    }
+    print_report(report)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
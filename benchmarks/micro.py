@@ -0,0 +1,306 @@
+"""Micro-benchmarks for the scorer and the database layer, with baselines.
+
+Times the scoring functions and the hot Database methods on synthetic
+databases of the requested sizes, then compares every timing with a saved
+baseline and exits non-zero when one got slower than --max-regression:
+
+    python benchmarks/micro.py --save --repeat 9 --min-time 0.5 --max-regression 50
+    python benchmarks/micro.py                           # gate against it
+    python benchmarks/micro.py --sizes 1000,100000,1000000
+
+A baseline stores the --min-time, --repeat and --max-regression it was
+recorded with, and later runs use them unless overridden. Synthetic
+databases are generated once and reused from --db-dir; each run writes to
+a throwaway copy, so they do not grow between runs. Baselines are machine
+specific; keep one per CI runner under benchmarks/baselines/.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from database import Database  # noqa: E402
+from utils.backups import copy_database  # noqa: E402
+from utils.batch_scoring import QUESTION_IDS, score_batch  # noqa: E402
+from utils.scoring import scorer  # noqa: E402
+
+# Bumped whenever benchmark names or their workloads change, so old
+# baselines are not compared against different measurements
+BASELINE_VERSION = 1
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baselines', 'micro.json')
+ANSWERS = 'ABCD'
+# Used when neither the command line nor the baseline sets them
+DEFAULT_SETTINGS = {'min_time': 0.2, 'repeat': 5, 'max_regression': 20}
+
+
+def build_database(path, participants, chunk_size=50000, seed=0):
+    """Fill a new database with scored synthetic participants"""
+    db = Database(path)
+    conn = db.get_connection()
+    rng = np.random.default_rng(seed)
+
+    for start in range(0, participants, chunk_size):
+        count = min(chunk_size, participants - start)
+        codes = rng.integers(0, len(ANSWERS), size=(count, len(QUESTION_IDS)))
+        scores = score_batch(codes)
+        user_ids = [str(uuid.uuid4()) for _ in range(count)]
+
+        conn.executemany(
+            "INSERT INTO users (id, first_name, last_name, email) VALUES (?, ?, ?, ?)",
+            [(user_id, f'First{start + i}', f'Last{start + i}',
+              f'user{start + i}@example.com')
+             for i, user_id in enumerate(user_ids)])
+        conn.executemany(
+            "INSERT INTO answer_sets (user_id, answers) VALUES (?, ?)",
+            [(user_id, "".join(ANSWERS[code] for code in row))
+             for user_id, row in zip(user_ids, codes.tolist())])
+        conn.executemany(
+            '''INSERT INTO results
+            (id, user_id, primary_style, secondary_style, adequacy_score, adequacy_level,
+             directiv_score, informativ_score, participativ_score, delegativ_score)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            [(str(uuid.uuid4()), user_id, primary, secondary, adequacy, level,
+              *style_scores)
+             for user_id, primary, secondary, adequacy, level, style_scores in zip(
+                 user_ids, scores['primary_style'].tolist(),
+                 scores['secondary_style'].tolist(),
+                 scores['adequacy_score'].tolist(),
+                 scores['adequacy_level'].tolist(),
+                 scores['style_scores'].tolist())])
+        conn.commit()
+
+    conn.execute("PRAGMA analysis_limit=1000")
+    conn.execute("ANALYZE")
+    conn.commit()
+    db.close()
+
+
+def synthetic_database(db_dir, participants):
+    path = os.path.join(db_dir, f'synthetic_{participants}.db')
+    if not os.path.exists(path):
+        print(f"Generating {participants} participants in {path} ...")
+        tmp_path = f'{path}.tmp'
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(tmp_path + suffix):
+                os.remove(tmp_path + suffix)
+        build_database(tmp_path, participants)
+        os.replace(tmp_path, path)
+    return path
+
+
+def remove_database(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def measure(fn, min_time=0.2, repeat=5):
+    """Best seconds per call over several timed loops, timeit style"""
+    start = time.perf_counter()
+    fn()
+    single = time.perf_counter() - start
+
+    number = max(1, int(min_time / max(single, 1e-7)))
+    # Calls that take seconds each are only repeated a few times
+    repeat = repeat if single < 0.5 else min(repeat, 3)
+    best = single
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            best = min(best, (time.perf_counter() - start) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best
+
+
+def random_responses(rng):
+    return {q: rng.choice(ANSWERS) for q in QUESTION_IDS}
+
+
+def scorer_benchmarks():
+    rng = random.Random(0)
+    samples = [random_responses(rng) for _ in range(64)]
+    rows = [[{'question_id': q, 'answer': a} for q, a in r.items()]
+            for r in samples]
+    cycle = {'i': 0}
+
+    def pick(items):
+        cycle['i'] = (cycle['i'] + 1) % len(items)
+        return items[cycle['i']]
+
+    return {
+        'scorer.calculate_style_scores':
+            lambda: scorer.calculate_style_scores(pick(samples)),
+        'scorer.calculate_adequacy_score':
+            lambda: scorer.calculate_adequacy_score(pick(samples)),
+        'scorer.get_all_style_scores':
+            lambda: scorer.get_all_style_scores(pick(rows)),
+        'scorer.score':
+            lambda: scorer.score(pick(samples)),
+    }
+
+
+def database_benchmarks(db):
+    conn = db.get_connection()
+    user_ids = [row[0] for row in conn.execute(
+        "SELECT user_id FROM results ORDER BY random() LIMIT 1000")]
+    rng = random.Random(0)
+    writer_id = db.create_user('Bench', 'Writer', 'bench.writer@example.com')
+
+    return {
+        'db.create_user':
+            lambda: db.create_user('Bench', 'User', 'bench.user@example.com'),
+        'db.save_response':
+            lambda: db.save_response(writer_id, rng.choice(QUESTION_IDS),
+                                     rng.choice(ANSWERS)),
+        'db.get_user_results':
+            lambda: db.get_user_results(rng.choice(user_ids)),
+        'db.get_all_results_with_responses':
+            db.get_all_results_with_responses,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, db_dir, only, min_time, repeat):
+    timings = {}
+
+    def record(name, fn):
+        if only and not any(part in name for part in only):
+            return
+        seconds = measure(fn, min_time, repeat)
+        timings[name] = seconds
+        print(f"  {name:<46} {seconds * 1e6:>14.1f} us")
+
+    print("Scorer")
+    for name, fn in scorer_benchmarks().items():
+        record(name, fn)
+
+    for size in sizes:
+        # The write benchmarks add rows, so they run on a fresh copy
+        work_path = os.path.join(db_dir, f'work_{size}.db')
+        remove_database(work_path)
+        copy_database(synthetic_database(db_dir, size), work_path, pages=-1, pause=0)
+        db = Database(work_path)
+        try:
+            print(f"Database, {size} participants")
+            for name, fn in database_benchmarks(db).items():
+                record(f'{name}@{size}', fn)
+        finally:
+            db.close()
+            remove_database(work_path)
+    return timings
+
+
+def compare(timings, baseline, max_regression):
+    """Print changes against the baseline; True if anything regressed or the
+    baseline is from a different benchmark version"""
+    if baseline.get('version') != BASELINE_VERSION:
+        print(f"\n❌ Baseline version {baseline.get('version')} does not match "
+              f"{BASELINE_VERSION}; record a new one with --save")
+        return True
+
+    regressed = False
+    print(f"\nCompared with baseline from {baseline.get('revision') or 'unknown revision'} "
+          f"({max_regression:.0f}% allowed):")
+    for name, seconds in timings.items():
+        old = baseline['timings'].get(name)
+        if not old:
+            print(f"  {name:<46} (no baseline)")
+            continue
+        change = (seconds - old) / old * 100
+        flag = ''
+        if change > max_regression:
+            flag = '  ❌ slower'
+            regressed = True
+        print(f"  {name:<46} {change:+7.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000',
+                        help='Comma-separated synthetic database sizes')
+    parser.add_argument('--db-dir',
+                        default=os.path.join(tempfile.gettempdir(),
+                                             'leadership-benchmarks'),
+                        help='Where synthetic databases are generated and reused')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='Baseline JSON file to compare with or save to')
+    parser.add_argument('--save', action='store_true',
+                        help='Record this run as the new baseline')
+    # Defaults come from the baseline, then DEFAULT_SETTINGS
+    parser.add_argument('--max-regression', type=float,
+                        help='Allowed slowdown per benchmark (%%)')
+    parser.add_argument('--min-time', type=float,
+                        help='Minimum seconds per timed loop; raise on noisy machines')
+    parser.add_argument('--repeat', type=int,
+                        help='Timed loops per benchmark; the fastest is kept')
+    parser.add_argument('--only', action='append', default=[],
+                        help='Only run benchmarks whose name contains this')
+    args = parser.parse_args()
+
+    previous = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            previous = json.load(f)
+    settings = dict(DEFAULT_SETTINGS, **(previous or {}).get('settings', {}))
+    for key in settings:
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    print(f"min-time {settings['min_time']} s, repeat {settings['repeat']}, "
+          f"max-regression {settings['max_regression']:.0f}%")
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    os.makedirs(args.db_dir, exist_ok=True)
+    timings = run(sizes, args.db_dir, args.only, settings['min_time'],
+                  settings['repeat'])
+
+    if args.save:
+        baseline = {'version': BASELINE_VERSION,
+                    'revision': git_revision(),
+                    'python': platform.python_version(),
+                    'machine': platform.machine(),
+                    'settings': settings,
+                    'timings': timings}
+        # Keep entries for benchmarks that were not run this time
+        if previous and previous.get('version') == BASELINE_VERSION:
+            baseline['timings'] = {**previous['timings'], **timings}
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if previous is None:
+        print(f"\n❌ No baseline at {args.baseline}; record one with --save")
+        return 1
+    return 1 if compare(timings, previous, settings['max_regression']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,35 +3,170 @@ import uuid
 import re
 from datetime import datetime
 import os
-import shutil
+import threading
+import weakref
+
+from utils.backups import copy_database
+from utils.metrics import metrics, timed_query
+
+# Every live Database, so forked gunicorn workers can drop inherited connections
+_instances = weakref.WeakSet()
+
+
+def _reset_connections_after_fork():
+    for instance in list(_instances):
+        instance._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_connections_after_fork)
+
 
 class Database:
-    def __init__(self, db_path=None):
+    # Columns included in supervisor exports, in output order
+    EXPORT_COLUMNS = ('first_name', 'last_name', 'email', 'primary_style',
+                      'secondary_style', 'adequacy_score', 'adequacy_level',
+                      'directiv_score', 'informativ_score', 'participativ_score',
+                      'delegativ_score', 'created_at')
+    
+    # Sort keys accepted by query_results, mapped to SQL expressions
+    RESULT_SORT_COLUMNS = {
+        'name': 'u.first_name COLLATE NOCASE, u.last_name COLLATE NOCASE, u.rowid',
+        'email': 'u.email COLLATE NOCASE, u.rowid',
+        'primary_style': 'r.primary_style',
+        'secondary_style': 'r.secondary_style',
+        'adequacy_score': 'r.adequacy_score',
+        'adequacy_level': 'r.adequacy_level',
+        'directiv_score': 'r.directiv_score',
+        'informativ_score': 'r.informativ_score',
+        'participativ_score': 'r.participativ_score',
+        'delegativ_score': 'r.delegativ_score',
+        'created_at': 'r.created_at',
+    }
+    
+    # cohort_stats dimensions and the SQL that buckets a results row into each
+    STATS_DIMENSIONS = {
+        'all': "''",
+        'primary_style': "{row}.primary_style",
+        'adequacy_level': "{row}.adequacy_level",
+        'day': "COALESCE(date({row}.created_at), '')",
+    }
+    STATS_SCORE_COLUMNS = ('adequacy_score', 'directiv_score', 'informativ_score',
+                           'participativ_score', 'delegativ_score')
+    
+    # Answers are stored packed: one answer_sets row per participant whose
+    # answers string holds one character per question in this order, with
+    # '-' for questions not answered yet
+    QUESTION_IDS = tuple(range(1, 13))
+    VALID_ANSWERS = 'ABCD'
+    EMPTY_ANSWERS = '-' * len(QUESTION_IDS)
+    
+    # Connection tuning applied to every pooled connection
+    BUSY_TIMEOUT_MS = 5000
+    CACHE_SIZE_KB = 8192
+    STATEMENT_CACHE_SIZE = 256
+
+    def __init__(self, db_path=None, read_only=False):
         # Use DATABASE_PATH from environment, fallback to local data folder
+        self._seed_from_default = db_path is None
         if db_path is None:
             db_path = os.environ.get('DATABASE_PATH', 'data/assessment.db')
-            
-            # Auto-seed for dev environment if database doesn't exist
-            if not os.path.exists(db_path) and os.path.exists('seed/assessment.db'):
-                print("Initializing development database from seed...")
-                os.makedirs('data', exist_ok=True)
-                shutil.copy2('seed/assessment.db', db_path)
-                print(f"Database copied to {db_path}")
         
         self.db_path = db_path
+        # Read-only instances (e.g. over a snapshot) skip seeding and migrations
+        self.read_only = read_only
+        self._local = threading.local()
+        self._orphaned = []
+        _instances.add(self)
+        
+        # Seeding and migrations run on first use, not at import time
+        self._init_lock = threading.RLock()
+        self._initializing = False
+        self._initialized = False
+    
+    def _ensure_initialized(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            # _initializing lets init_db() itself open connections
+            if self._initialized or self._initializing:
+                return
+            self._initializing = True
+            try:
+                if not self.read_only:
+                    self._prepare_file()
+                    self.init_db()
+                self._initialized = True
+            finally:
+                self._initializing = False
+    
+    def _prepare_file(self):
+        db_path = self.db_path
+        
+        # Auto-seed for dev environment if database doesn't exist
+        if self._seed_from_default and not os.path.exists(db_path) and os.path.exists('seed/assessment.db'):
+            print("Initializing development database from seed...")
+            os.makedirs('data', exist_ok=True)
+            # Through the backup API, so a seed left in WAL mode copies whole
+            copy_database('seed/assessment.db', db_path, pages=-1, pause=0, standalone=False)
+            print(f"Database copied to {db_path}")
         
         # Create directory if it doesn't exist
         db_dir = os.path.dirname(db_path)
         if db_dir:  # Only create if there's a directory part
             os.makedirs(db_dir, exist_ok=True)
-        
-        self.init_db()
     
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+        """Return this thread's persistent connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._open_connection()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def _open_connection(self):
+        self._ensure_initialized()
+        metrics.inc('db_connections_opened_total')
+        if self.read_only:
+            conn = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro",
+                uri=True,
+                timeout=self.BUSY_TIMEOUT_MS / 1000,
+                cached_statements=self.STATEMENT_CACHE_SIZE
+            )
+        else:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.BUSY_TIMEOUT_MS / 1000,
+                cached_statements=self.STATEMENT_CACHE_SIZE
+            )
         conn.row_factory = sqlite3.Row
+        # WAL lets readers proceed while a writer holds the lock; NORMAL sync is
+        # durable across application crashes and avoids an fsync per commit
+        if not self.read_only:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.BUSY_TIMEOUT_MS)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.CACHE_SIZE_KB)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
         return conn
     
+    def close(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local = threading.local()
+    
+    def _reset_after_fork(self):
+        # A connection must never be used (or closed) on both sides of a fork;
+        # keep a reference so the child never finalizes the parent's handle
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._orphaned.append(conn)
+        self._local = threading.local()
+    
     def init_db(self):
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -47,16 +182,16 @@ class Database:
             )
         ''')
         
-        # Responses table
+        # Answers, packed into one row per participant (see QUESTION_IDS).
+        # WITHOUT ROWID keeps the row inside the user_id B-tree, so there is
+        # no separate rowid table and index to maintain
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS responses (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                question_id INTEGER NOT NULL,
-                answer TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CREATE TABLE IF NOT EXISTS answer_sets (
+                user_id TEXT PRIMARY KEY,
+                answers TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users(id)
-            )
+            ) WITHOUT ROWID
         ''')
         
         # Results table with style score columns
@@ -77,11 +212,57 @@ class Database:
             )
         ''')
         
+        # Monotonic counter bumped whenever exported data changes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+        
+        # Background export jobs, visible to every worker
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS export_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                file_path TEXT,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Server-side sessions shared by all workers
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at INTEGER NOT NULL
+            )
+        ''')
+        
         # Migration: Handle persuasiv_score -> informativ_score transition
         self._migrate_persuasiv_to_informativ(cursor)
         
+        # One row per answer -> packed answer_sets is destructive, so it only
+        # runs from `flask migrate-answers`; here it is just detected
+        self._check_answer_schema(cursor)
+        
+        # Indexes for the per-user lookups and the supervisor ordering
+        self._create_indexes(cursor)
+        
+        # Aggregates kept current by triggers on results
+        self._create_cohort_stats(cursor)
+        
+        # Sampled statistics so the planner picks between these indexes well
+        cursor.execute("PRAGMA analysis_limit=1000")
+        cursor.execute("ANALYZE")
+        
         conn.commit()
-        conn.close()
+        cursor.close()
     
     def _migrate_persuasiv_to_informativ(self, cursor):
         """Migrate from persuasiv_score to informativ_score column and update style names"""
@@ -151,11 +332,276 @@ class Database:
             print(f"❌ Migration error: {e}")
             raise
     
+    def _check_answer_schema(self, cursor):
+        """Warn when the legacy responses table still needs migrating"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='responses'")
+        if cursor.fetchone():
+            print("⚠️ Legacy responses table found; answers saved in it are not shown "
+                  "until `flask migrate-answers` is run (seed_db.sh runs it on deploy)")
+    
+    def has_legacy_responses(self):
+        """True while the pre-answer_sets responses table exists"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='responses'")
+            return cursor.fetchone() is not None
+        finally:
+            cursor.close()
+    
+    def migrate_responses_to_answer_sets(self):
+        """Fold the legacy responses table (one UUID-keyed row per answer)
+        into answer_sets, keeping the latest answer to each question.
+        
+        Answers already in answer_sets win over legacy ones for the same
+        question. The responses table is dropped and the file vacuumed, so
+        take a snapshot first. Returns the number of participants migrated,
+        or None when there was nothing to migrate.
+        """
+        conn = self.get_connection()
+        conn.commit()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='responses'")
+            if not cursor.fetchone():
+                conn.commit()
+                return None
+            
+            columns = " || ".join(
+                f"COALESCE(MAX(CASE WHEN question_id = {q} THEN substr(upper(answer), 1, 1) END), '-')"
+                for q in self.QUESTION_IDS
+            )
+            merged = " || ".join(
+                f"CASE WHEN substr(answers, {i}, 1) = '-' THEN substr(excluded.answers, {i}, 1) "
+                f"ELSE substr(answers, {i}, 1) END"
+                for i in range(1, len(self.QUESTION_IDS) + 1)
+            )
+            # The bare answer column is taken from the MAX(rowid) row, i.e.
+            # the most recent answer to each question
+            cursor.execute(
+                f"""INSERT INTO answer_sets (user_id, answers, updated_at)
+                SELECT user_id, {columns}, MAX(created_at) FROM (
+                    SELECT user_id, question_id, answer, created_at, MAX(rowid)
+                    FROM responses
+                    GROUP BY user_id, question_id
+                )
+                WHERE true
+                GROUP BY user_id
+                ON CONFLICT(user_id) DO UPDATE SET answers = {merged}"""
+            )
+            migrated = cursor.rowcount
+            cursor.execute("DROP TABLE responses")
+            self._bump_data_version(cursor)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+        
+        # Hand the dropped table's pages back to the filesystem
+        try:
+            conn.execute("VACUUM")
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ VACUUM skipped ({e}); run it later to shrink the file")
+        return migrated
+    
+    def _create_indexes(self, cursor):
+        """Add lookup indexes missing from databases created before they existed"""
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_user ON results(user_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_created_at ON results(created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)")
+        
+        # Supervisor table: prefix search on name/email, filters and sorts; every
+        # index ends in the rowid, which doubles as the stable tie-breaker
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_name ON users(first_name COLLATE NOCASE, last_name COLLATE NOCASE)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_last_name ON users(last_name COLLATE NOCASE)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email COLLATE NOCASE)")
+        # primary_style/adequacy_level have a handful of values each, so they are
+        # filtered while walking one of these rather than indexed themselves
+        for column in ('adequacy_score', 'directiv_score', 'informativ_score',
+                       'participativ_score', 'delegativ_score'):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_results_{column} ON results({column})")
+    
+    def _create_cohort_stats(self, cursor):
+        """Create the cohort_stats table and the triggers that maintain it"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cohort_stats'")
+        is_new = cursor.fetchone() is None
+        
+        sums = ",\n                ".join(
+            f"{c.replace('_score', '')}_sum INTEGER NOT NULL DEFAULT 0"
+            for c in self.STATS_SCORE_COLUMNS
+        )
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS cohort_stats (
+                dimension TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                participants INTEGER NOT NULL DEFAULT 0,
+                {sums},
+                PRIMARY KEY (dimension, bucket)
+            )
+        ''')
+        
+        watched = ", ".join(('primary_style', 'adequacy_level', 'created_at') + self.STATS_SCORE_COLUMNS)
+        triggers = {
+            'trg_results_stats_insert': ("AFTER INSERT ON results", self._stats_trigger_body('NEW', '+')),
+            'trg_results_stats_delete': ("AFTER DELETE ON results", self._stats_trigger_body('OLD', '-')),
+            'trg_results_stats_update': (
+                f"AFTER UPDATE OF {watched} ON results",
+                self._stats_trigger_body('OLD', '-') + self._stats_trigger_body('NEW', '+')
+            ),
+        }
+        for name, (event, body) in triggers.items():
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+        
+        if is_new:
+            # Existing results predate the triggers
+            self._rebuild_cohort_stats(cursor)
+    
+    def _stats_trigger_body(self, row, sign):
+        statements = []
+        for dimension, bucket in self.STATS_DIMENSIONS.items():
+            bucket = bucket.format(row=row)
+            deltas = ", ".join(
+                f"{c.replace('_score', '')}_sum = {c.replace('_score', '')}_sum {sign} COALESCE({row}.{c}, 0)"
+                for c in self.STATS_SCORE_COLUMNS
+            )
+            statements.append(
+                f"INSERT OR IGNORE INTO cohort_stats (dimension, bucket) VALUES ('{dimension}', {bucket});"
+            )
+            statements.append(
+                f"UPDATE cohort_stats SET participants = participants {sign} 1, {deltas} "
+                f"WHERE dimension = '{dimension}' AND bucket = {bucket};"
+            )
+        return " ".join(statements)
+    
+    def _compute_cohort_stats(self, cursor):
+        """Aggregate results from scratch: {(dimension, bucket): (participants, sums...)}"""
+        expected = {}
+        sums = ", ".join(f"SUM(COALESCE({c}, 0))" for c in self.STATS_SCORE_COLUMNS)
+        for dimension, bucket in self.STATS_DIMENSIONS.items():
+            bucket = bucket.format(row='results')
+            cursor.execute(f"SELECT {bucket}, COUNT(*), {sums} FROM results GROUP BY 1")
+            for row in cursor.fetchall():
+                expected[(dimension, row[0])] = tuple(row[1:])
+        return expected
+    
+    def _rebuild_cohort_stats(self, cursor):
+        expected = self._compute_cohort_stats(cursor)
+        columns = ", ".join(f"{c.replace('_score', '')}_sum" for c in self.STATS_SCORE_COLUMNS)
+        placeholders = ", ".join("?" * (3 + len(self.STATS_SCORE_COLUMNS)))
+        cursor.execute("DELETE FROM cohort_stats")
+        cursor.executemany(
+            f"INSERT INTO cohort_stats (dimension, bucket, participants, {columns}) VALUES ({placeholders})",
+            [key + values for key, values in expected.items()]
+        )
+    
+    @timed_query
+    def rebuild_cohort_stats(self):
+        """Recompute cohort_stats from results and report drift
+        
+        Returns a list of (dimension, bucket, stored, expected) tuples for
+        every bucket whose stored aggregate did not match.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            # Hold the write lock so no result lands between check and rebuild
+            cursor.execute("BEGIN IMMEDIATE")
+            expected = self._compute_cohort_stats(cursor)
+            
+            columns = ", ".join(f"{c.replace('_score', '')}_sum" for c in self.STATS_SCORE_COLUMNS)
+            cursor.execute(f"SELECT dimension, bucket, participants, {columns} FROM cohort_stats")
+            stored = {
+                (row[0], row[1]): tuple(row[2:])
+                for row in cursor.fetchall()
+                if row[2] != 0
+            }
+            
+            drift = [
+                (key[0], key[1], stored.get(key), expected.get(key))
+                for key in sorted(set(stored) | set(expected))
+                if stored.get(key) != expected.get(key)
+            ]
+            
+            self._rebuild_cohort_stats(cursor)
+            conn.commit()
+            return drift
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def get_cohort_stats(self):
+        """Dashboard statistics read from the cohort_stats aggregates"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "SELECT * FROM cohort_stats WHERE participants > 0 ORDER BY dimension, bucket"
+            )
+            rows = [dict(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+        
+        def summary(row):
+            count = row['participants']
+            return {
+                'participants': count,
+                'mean_scores': {
+                    c: round(row[f"{c.replace('_score', '')}_sum"] / count, 2)
+                    for c in self.STATS_SCORE_COLUMNS
+                }
+            }
+        
+        stats = {
+            'total': 0,
+            'mean_scores': {c: None for c in self.STATS_SCORE_COLUMNS},
+            'primary_style': {},
+            'adequacy_level': {},
+            'day': {},
+        }
+        for row in rows:
+            if row['dimension'] == 'all':
+                overall = summary(row)
+                stats['total'] = overall['participants']
+                stats['mean_scores'] = overall['mean_scores']
+            elif row['dimension'] == 'day':
+                stats['day'][row['bucket']] = row['participants']
+            else:
+                stats[row['dimension']][row['bucket']] = summary(row)
+        return stats
+    
+    def _bump_data_version(self, cursor):
+        # Runs inside the caller's transaction so the bump commits with the change
+        cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+    
+    @timed_query
+    def get_data_version(self):
+        """Current data version; changes whenever results are saved or deleted"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT value FROM meta WHERE key = 'data_version'")
+            row = cursor.fetchone()
+            return row['value'] if row else 0
+        finally:
+            cursor.close()
+    
     def validate_email(self, email: str) -> bool:
         """Validate email format using regex"""
         pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
         return bool(re.match(pattern, email))
     
+    @timed_query
     def create_user(self, first_name, last_name, email):
         """Create a new user"""
         if not self.validate_email(email):
@@ -176,26 +622,85 @@ class Database:
             conn.rollback()
             raise e
         finally:
-            conn.close()
+            cursor.close()
+    
+    # Insert a participant's row, or replace one character of an existing one.
+    # ?1 user_id, ?2 position (1-based), ?3 answer, ?4 EMPTY_ANSWERS.
+    # Answers for users that no longer exist are skipped: write-behind queues
+    # in other worker processes can still hold answers for a deleted user
+    _UPSERT_ANSWER_SQL = """INSERT INTO answer_sets (user_id, answers)
+        SELECT ?1, substr(?4, 1, ?2 - 1) || ?3 || substr(?4, ?2 + 1)
+        WHERE EXISTS (SELECT 1 FROM users WHERE id = ?1)
+        ON CONFLICT(user_id) DO UPDATE SET
+            answers = substr(answers, 1, ?2 - 1) || ?3 || substr(answers, ?2 + 1),
+            updated_at = CURRENT_TIMESTAMP"""
     
+    def _answer_params(self, user_id, question_id, answer):
+        try:
+            position = self.QUESTION_IDS.index(int(question_id)) + 1
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid question {question_id}")
+        answer = str(answer).upper()
+        if len(answer) != 1 or answer not in self.VALID_ANSWERS:
+            raise ValueError(f"Invalid answer for question {question_id}")
+        return (str(user_id), position, answer, self.EMPTY_ANSWERS)
+    
+    @timed_query
     def save_response(self, user_id, question_id, answer):
-        """Save user's response to a question"""
-        response_id = str(uuid.uuid4())
+        """Save (or replace) user's answer to a question"""
+        params = self._answer_params(user_id, question_id, answer)
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            cursor.execute(
-                "INSERT INTO responses (id, user_id, question_id, answer) VALUES (?, ?, ?, ?)",
-                (response_id, str(user_id), question_id, answer)
-            )
+            cursor.execute(self._UPSERT_ANSWER_SQL, params)
             conn.commit()
         except Exception as e:
             conn.rollback()
             raise e
         finally:
-            conn.close()
+            cursor.close()
+    
+    @timed_query
+    def save_responses(self, user_id, answers):
+        """Save several (question_id, answer) pairs in a single transaction"""
+        self.save_response_batch((user_id, question_id, answer)
+                                 for question_id, answer in answers)
+    
+    @timed_query
+    def save_response_batch(self, rows):
+        """Save (user_id, question_id, answer) rows from any number of users
+        in a single transaction"""
+        params = [self._answer_params(*row) for row in rows]
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany(self._UPSERT_ANSWER_SQL, params)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+    
+    def _reorder_answers(self, answers, question_ids):
+        """Packed answers re-ordered for question_ids ('-' for unknown ones)"""
+        question_ids = tuple(question_ids)
+        if question_ids == self.QUESTION_IDS:
+            return answers
+        positions = {q: i for i, q in enumerate(self.QUESTION_IDS)}
+        return "".join(answers[positions[q]] if q in positions else '-'
+                       for q in question_ids)
     
+    def _format_pattern(self, answers):
+        """Packed answers as the "1.A, 2.B, ..." pattern shown to supervisors"""
+        if not answers:
+            return ''
+        return ", ".join(f"{q}.{a}" for q, a in zip(self.QUESTION_IDS, answers)
+                         if a != '-')
+    
+    @timed_query
     def save_results(self, user_id, primary_style, secondary_style, adequacy_score, adequacy_level, style_scores):
         """Save assessment results"""
         result_id = str(uuid.uuid4())
@@ -213,13 +718,76 @@ class Database:
                  style_scores['Directiv'], style_scores['Informativ'], 
                  style_scores['Participativ'], style_scores['Delegativ'])
             )
+            self._bump_data_version(cursor)
             conn.commit()
         except Exception as e:
             conn.rollback()
             raise e
         finally:
-            conn.close()
+            cursor.close()
+    
+    @timed_query
+    def import_participants(self, rows):
+        """Insert complete, already scored participants in one transaction.
+        
+        Each row is (first_name, last_name, email, answers, primary_style,
+        secondary_style, adequacy_score, adequacy_level, directiv,
+        informativ, participativ, delegativ), with answers packed in
+        QUESTION_IDS order. Returns the new user IDs.
+        """
+        rows = [(str(uuid.uuid4()), str(uuid.uuid4()), *row) for row in rows]
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany(
+                "INSERT INTO users (id, first_name, last_name, email) VALUES (?, ?, ?, ?)",
+                [(user_id, first_name, last_name, email)
+                 for user_id, _, first_name, last_name, email, *_ in rows]
+            )
+            cursor.executemany(
+                "INSERT INTO answer_sets (user_id, answers) VALUES (?, ?)",
+                [(row[0], row[5]) for row in rows]
+            )
+            cursor.executemany(
+                '''INSERT INTO results
+                (id, user_id, primary_style, secondary_style, adequacy_score, adequacy_level,
+                 directiv_score, informativ_score, participativ_score, delegativ_score)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                [(result_id, user_id, *row[4:]) for user_id, result_id, *row in rows]
+            )
+            self._bump_data_version(cursor)
+            conn.commit()
+            return [row[0] for row in rows]
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def get_result_version(self, user_id):
+        """Cheap lookup of the fields that identify a user's stored result
+        
+        Reads results only (through idx_results_user), so callers can validate
+        a cached rendering without the full join in get_user_results.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                """SELECT created_at, primary_style, secondary_style, adequacy_score, adequacy_level,
+                directiv_score, informativ_score, participativ_score, delegativ_score
+                FROM results WHERE user_id = ? ORDER BY rowid LIMIT 1""",
+                (str(user_id),)
+            )
+            row = cursor.fetchone()
+            return tuple(row) if row else None
+        finally:
+            cursor.close()
     
+    @timed_query
     def get_user_results(self, user_id):
         """Get results for a specific user"""
         conn = self.get_connection()
@@ -229,7 +797,8 @@ class Database:
             cursor.execute(
                 """SELECT u.*, r.* FROM users u 
                 JOIN results r ON u.id = r.user_id 
-                WHERE u.id = ?""",
+                WHERE u.id = ?
+                ORDER BY r.rowid LIMIT 1""",
                 (str(user_id),)
             )
             result = cursor.fetchone()
@@ -237,8 +806,9 @@ class Database:
         except Exception as e:
             raise e
         finally:
-            conn.close()
+            cursor.close()
     
+    @timed_query
     def get_all_results(self):
         """Get all results for supervisor view"""
         conn = self.get_connection()
@@ -255,56 +825,555 @@ class Database:
         except Exception as e:
             raise e
         finally:
+            cursor.close()
+    
+    @timed_query
+    def count_results(self):
+        """Total number of stored results"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT COUNT(*) FROM results")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def query_results(self, offset=0, limit=25, order_by='created_at', descending=True,
+                      search=None, style=None, adequacy_level=None):
+        """One page of results for the supervisor table
+        
+        search matches the start of first name, last name or email for every
+        word given. Returns (total, filtered, rows), where rows carry the
+        response pattern of just the participants on this page.
+        """
+        clauses = []
+        params = []
+        for word in (search or '').split():
+            # Prefix match keeps LIKE on the NOCASE indexes
+            pattern = word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            clauses.append(
+                "(u.first_name LIKE ? ESCAPE '\\' OR u.last_name LIKE ? ESCAPE '\\'"
+                " OR u.email LIKE ? ESCAPE '\\')"
+            )
+            params.extend([pattern] * 3)
+        if style:
+            clauses.append("r.primary_style = ?")
+            params.append(style)
+        if adequacy_level:
+            clauses.append("r.adequacy_level = ?")
+            params.append(adequacy_level)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        
+        direction = 'DESC' if descending else 'ASC'
+        order = ", ".join(
+            f"{expr} {direction}"
+            for expr in self.RESULT_SORT_COLUMNS.get(order_by, 'r.created_at').split(', ')
+        )
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT COUNT(*) FROM results")
+            total = cursor.fetchone()[0]
+            
+            if where:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM users u JOIN results r ON u.id = r.user_id {where}",
+                    params
+                )
+                filtered = cursor.fetchone()[0]
+            else:
+                filtered = total
+            
+            # Page over rowids first so OFFSET skips index entries, not joined rows;
+            # users only joins the inner query when searched or sorted on
+            needs_users = bool(search and search.split()) or order_by in ('name', 'email')
+            inner_from = "results r JOIN users u ON u.id = r.user_id" if needs_users else "results r"
+            cursor.execute(
+                f"""SELECT r.user_id, u.first_name, u.last_name, u.email,
+                r.primary_style, r.secondary_style, r.adequacy_score, r.adequacy_level,
+                r.directiv_score, r.informativ_score, r.participativ_score, r.delegativ_score,
+                r.created_at
+                FROM (
+                    SELECT r.rowid AS result_rowid FROM {inner_from}
+                    {where}
+                    ORDER BY {order}, r.rowid {direction}
+                    LIMIT ? OFFSET ?
+                ) page
+                JOIN results r ON r.rowid = page.result_rowid
+                JOIN users u ON u.id = r.user_id
+                ORDER BY {order}, r.rowid {direction}""",
+                params + [int(limit), int(offset)]
+            )
+            rows = [dict(row) for row in cursor.fetchall()]
+            
+            # Response patterns for this page only
+            user_ids = list({row['user_id'] for row in rows})
+            patterns = {}
+            if user_ids:
+                placeholders = ", ".join("?" * len(user_ids))
+                cursor.execute(
+                    f"SELECT user_id, answers FROM answer_sets WHERE user_id IN ({placeholders})",
+                    user_ids
+                )
+                patterns = {row[0]: self._format_pattern(row[1]) for row in cursor.fetchall()}
+            for row in rows:
+                row['response_pattern'] = patterns.get(row['user_id'], '')
+            
+            return total, filtered, rows
+        finally:
+            cursor.close()
+    
+    def _export_where(self, date_from, date_to, style, adequacy_level):
+        clauses = []
+        params = []
+        if date_from:
+            clauses.append("r.created_at >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("r.created_at < date(?, '+1 day')")
+            params.append(date_to)
+        if style:
+            clauses.append("r.primary_style = ?")
+            params.append(style)
+        if adequacy_level:
+            clauses.append("r.adequacy_level = ?")
+            params.append(adequacy_level)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+    
+    @timed_query
+    def iter_export_rows(self, date_from=None, date_to=None, style=None,
+                         adequacy_level=None, chunk_size=1000):
+        """Stream EXPORT_COLUMNS tuples for the supervisor export, in chunks
+        
+        date_from/date_to are inclusive YYYY-MM-DD bounds on the result date,
+        style matches the primary style.
+        """
+        where, params = self._export_where(date_from, date_to, style, adequacy_level)
+        
+        # created_at comes from users, as it did through "u.*, r.*" rows
+        columns = ", ".join(
+            f"u.{c}" if c in ('first_name', 'last_name', 'email', 'created_at') else f"r.{c}"
+            for c in self.EXPORT_COLUMNS
+        )
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                f"""SELECT {columns} FROM users u
+                JOIN results r ON u.id = r.user_id
+                {where}
+                ORDER BY r.created_at DESC""",
+                params
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [tuple(row) for row in rows]
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def count_export_rows(self, date_from=None, date_to=None, style=None, adequacy_level=None):
+        """Number of rows iter_export_rows() yields for the same filters"""
+        where, params = self._export_where(date_from, date_to, style, adequacy_level)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM users u JOIN results r ON u.id = r.user_id {where}",
+                params
+            )
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def iter_report_rows(self, user_ids=None, date_from=None, date_to=None, style=None,
+                         adequacy_level=None, chunk_size=200):
+        """Stream user and result dicts for per-participant reports, in chunks
+        
+        Either user_ids selects the cohort (in request order, unknown IDs
+        skipped) or the export filters do, as for iter_export_rows().
+        """
+        # A separate connection, so the temp table and the open cursor do
+        # not interfere with the thread's pooled connection
+        conn = self._open_connection()
+        cursor = conn.cursor()
+        
+        try:
+            columns = """u.id AS user_id, u.first_name, u.last_name, u.email,
+                r.created_at, r.primary_style, r.secondary_style,
+                r.adequacy_score, r.adequacy_level,
+                r.directiv_score, r.informativ_score, r.participativ_score, r.delegativ_score"""
+            if user_ids is not None:
+                cursor.execute("CREATE TEMP TABLE report_ids (user_id TEXT PRIMARY KEY)")
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO temp.report_ids (user_id) VALUES (?)",
+                    ((str(user_id),) for user_id in user_ids)
+                )
+                cursor.execute(
+                    f"""SELECT {columns} FROM temp.report_ids c
+                    JOIN results r ON r.user_id = c.user_id
+                    JOIN users u ON u.id = r.user_id
+                    ORDER BY c.rowid"""
+                )
+            else:
+                where, params = self._export_where(date_from, date_to, style, adequacy_level)
+                cursor.execute(
+                    f"""SELECT {columns} FROM users u
+                    JOIN results r ON u.id = r.user_id
+                    {where}
+                    ORDER BY r.created_at DESC""",
+                    params
+                )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        finally:
+            cursor.close()
             conn.close()
     
+    @timed_query
     def get_user_responses(self, user_id):
-        """Get all responses for a specific user"""
+        """Get all responses for a specific user
+        
+        Unpacks the user's answer_sets row into the one-dict-per-answer shape
+        of the former responses table, ordered by question.
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
             cursor.execute(
-                '''SELECT r.*, u.first_name, u.last_name, u.email 
-                FROM responses r
-                JOIN users u ON r.user_id = u.id
-                WHERE r.user_id = ?
-                ORDER BY r.question_id''',
+                '''SELECT a.user_id, a.answers, a.updated_at, u.first_name, u.last_name, u.email
+                FROM answer_sets a
+                JOIN users u ON a.user_id = u.id
+                WHERE a.user_id = ?''',
                 (str(user_id),)
             )
-            results = cursor.fetchall()
-            return [dict(row) for row in results]
+            row = cursor.fetchone()
+            if row is None:
+                return []
+            return [{
+                'id': f"{row['user_id']}:{question_id}",
+                'user_id': row['user_id'],
+                'question_id': question_id,
+                'answer': answer,
+                'created_at': row['updated_at'],
+                'first_name': row['first_name'],
+                'last_name': row['last_name'],
+                'email': row['email']
+            } for question_id, answer in zip(self.QUESTION_IDS, row['answers']) if answer != '-']
         except Exception as e:
             raise e
         finally:
-            conn.close()
+            cursor.close()
     
+    @timed_query
     def get_all_results_with_responses(self):
         """Get all results with raw response patterns"""
-        results = self.get_all_results()
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                """SELECT u.*, r.*, a.answers AS packed_answers
+                FROM users u
+                JOIN results r ON u.id = r.user_id
+                LEFT JOIN answer_sets a ON a.user_id = r.user_id
+                ORDER BY r.created_at DESC"""
+            )
+            results = []
+            for row in cursor.fetchall():
+                result = dict(row)
+                result['response_pattern'] = self._format_pattern(result.pop('packed_answers'))
+                results.append(result)
+            return results
+        except Exception as e:
+            raise e
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def iter_answer_patterns(self, question_ids, chunk_size=50000):
+        """Stream (user_id, answers) for every user with results, in chunks.
+        
+        answers is one character per question in question_ids order, using
+        the latest answer to each question and '-' where none was given.
+        """
+        # A separate read connection keeps its snapshot while the pooled
+        # connection commits the rewritten results
+        conn = self._open_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "SELECT user_id, answers FROM answer_sets WHERE user_id IN (SELECT user_id FROM results)"
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [(row[0], self._reorder_answers(row[1], question_ids)) for row in rows]
+        finally:
+            cursor.close()
+            conn.close()
+    
+    @timed_query
+    def get_cohort_profiles(self, user_ids, question_ids):
+        """Results and answer patterns for any number of users in one query.
+        
+        The IDs go through a temp table rather than bound parameters, so the
+        cohort size is not limited by SQLite's variable count. Returns dicts
+        in request order; unknown IDs and users without results are skipped.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS cohort_ids (user_id TEXT PRIMARY KEY)"
+            )
+            cursor.execute("DELETE FROM temp.cohort_ids")
+            cursor.executemany(
+                "INSERT OR IGNORE INTO temp.cohort_ids (user_id) VALUES (?)",
+                ((str(user_id),) for user_id in user_ids)
+            )
+            cursor.execute(
+                """SELECT r.user_id, u.first_name, u.last_name, u.email,
+                r.primary_style, r.secondary_style,
+                r.directiv_score, r.informativ_score, r.participativ_score, r.delegativ_score,
+                r.adequacy_score, r.adequacy_level, COALESCE(a.answers, ?) AS answers
+                FROM temp.cohort_ids c
+                JOIN results r ON r.user_id = c.user_id
+                JOIN users u ON u.id = r.user_id
+                LEFT JOIN answer_sets a ON a.user_id = r.user_id
+                ORDER BY c.rowid, r.rowid""",
+                (self.EMPTY_ANSWERS,)
+            )
+            profiles = []
+            seen = set()
+            for row in cursor.fetchall():
+                if row['user_id'] not in seen:
+                    seen.add(row['user_id'])
+                    profile = dict(row)
+                    profile['answers'] = self._reorder_answers(profile['answers'], question_ids)
+                    profiles.append(profile)
+            cursor.execute("DELETE FROM temp.cohort_ids")
+            conn.commit()
+            return profiles
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def update_results_bulk(self, rows):
+        """Rewrite stored scores in one transaction.
         
-        for result in results:
-            responses = self.get_user_responses(result['user_id'])
-            # Format as "1.A, 2.B, 3.C, ..."
-            response_pattern = ", ".join([f"{r['question_id']}.{r['answer']}" for r in responses])
-            result['response_pattern'] = response_pattern
+        Each row is (primary_style, secondary_style, adequacy_score,
+        adequacy_level, directiv, informativ, participativ, delegativ, user_id).
+        Rows whose scores are unchanged are skipped, so their indexes and
+        cohort_stats triggers are left alone. Returns the number of rows
+        actually changed.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
-        return results
+        try:
+            cursor.executemany(
+                '''UPDATE results SET
+                primary_style = ?1, secondary_style = ?2, adequacy_score = ?3, adequacy_level = ?4,
+                directiv_score = ?5, informativ_score = ?6, participativ_score = ?7, delegativ_score = ?8
+                WHERE user_id = ?9 AND NOT (
+                    primary_style IS ?1 AND secondary_style IS ?2 AND adequacy_score IS ?3
+                    AND adequacy_level IS ?4 AND directiv_score IS ?5 AND informativ_score IS ?6
+                    AND participativ_score IS ?7 AND delegativ_score IS ?8)''',
+                rows
+            )
+            changed = cursor.rowcount
+            if changed > 0:
+                self._bump_data_version(cursor)
+            conn.commit()
+            return changed
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
     
+    @timed_query
     def delete_user_completely(self, user_id):
         """Delete user and all associated data"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            # Delete in order: responses first (due to foreign key), then results, then user
-            cursor.execute("DELETE FROM responses WHERE user_id = ?", (str(user_id),))
+            # Delete in order: answers first (due to foreign key), then results, then user
+            cursor.execute("DELETE FROM answer_sets WHERE user_id = ?", (str(user_id),))
+            removed = cursor.rowcount
             cursor.execute("DELETE FROM results WHERE user_id = ?", (str(user_id),))
+            removed += cursor.rowcount
             cursor.execute("DELETE FROM users WHERE id = ?", (str(user_id),))
+            deleted = cursor.rowcount > 0
+            # Cached exports stay valid when there was nothing to delete
+            if deleted or removed:
+                self._bump_data_version(cursor)
             
             conn.commit()
-            return cursor.rowcount > 0
+            return deleted
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def get_session(self, session_id, now):
+        """Return (data, expires_at) for an unexpired session, or None"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?",
+                (session_id, now)
+            )
+            row = cursor.fetchone()
+            return (row['data'], row['expires_at']) if row else None
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def save_session(self, session_id, data, expires_at):
+        """Insert or replace a session"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, data, expires_at)
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def delete_session(self, session_id):
+        """Remove a session"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def purge_expired_sessions(self, now):
+        """Delete every session that expired before now"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def create_export_job(self, job_id, status='queued', file_path=None, total=0):
+        """Record a new export job; a finished one starts at progress == total"""
+        progress = total if status == 'done' else 0
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "INSERT INTO export_jobs (id, status, file_path, progress, total) VALUES (?, ?, ?, ?, ?)",
+                (job_id, status, file_path, progress, total)
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def purge_export_jobs(self, max_age):
+        """Delete export jobs created more than max_age seconds ago"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "DELETE FROM export_jobs WHERE created_at < datetime('now', ?)",
+                (f'-{int(max_age)} seconds',)
+            )
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+    
+    @timed_query
+    def update_export_job(self, job_id, **fields):
+        """Update status/progress/total/file_path/error of an export job"""
+        allowed = {'status', 'progress', 'total', 'file_path', 'error'}
+        columns = [k for k in fields if k in allowed]
+        if not columns:
+            return
+        assignments = ", ".join(f"{k} = ?" for k in columns)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                f"UPDATE export_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                [fields[k] for k in columns] + [job_id]
+            )
+            conn.commit()
         except Exception as e:
             conn.rollback()
             raise e
         finally:
-            conn.close()
\ No newline at end of file
+            cursor.close()
+    
+    @timed_query
+    def get_export_job(self, job_id):
+        """Return an export job as a dict, or None"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT * FROM export_jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+        finally:
+            cursor.close()
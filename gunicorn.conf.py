@@ -0,0 +1,8 @@
+"""gunicorn settings read automatically from the working directory"""
+# Imported up front: child_exit runs inside the master's SIGCHLD handler
+from utils.metrics import metrics
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's counters without leaving its file behind
+    metrics.mark_process_dead(worker.pid)
@@ -2,10 +2,16 @@
 
 # Database seeding script for Dokploy deployment
 # Copies seed database to volume mount location on first run
+#
+# The live database runs in WAL mode, so most of its data can sit in the
+# -wal file next to a small main file: whether it holds data is decided by
+# asking SQLite, never by file size. The seed is copied with the backup API,
+# and a database that already has participants is never touched.
+
+cd "$(dirname "$0")"
 
 TARGET_DB="${DATABASE_PATH:-/app/data/assessment.db}"
-SEED_DB="/app/seed/assessment.db"
-MIN_SIZE=40000  # 40KB threshold - empty DB with schema is ~20KB, populated is ~53KB
+SEED_DB="${SEED_DATABASE_PATH:-/app/seed/assessment.db}"
 
 echo "Database seeding check..."
 echo "Target: $TARGET_DB"
@@ -19,42 +25,65 @@ mkdir -p "$TARGET_DIR"
 if [ ! -f "$SEED_DB" ]; then
     echo "ERROR: Seed database not found at $SEED_DB"
     echo "Application will create new empty database"
-    exit 0
-fi
+else
+    python - "$SEED_DB" "$TARGET_DB" <<'EOF'
+import os
+import sqlite3
+import sys
 
-# Get seed database size for reference
-SEED_SIZE=$(stat -c%s "$SEED_DB" 2>/dev/null || stat -f%z "$SEED_DB" 2>/dev/null || echo 0)
-echo "Seed database size: $SEED_SIZE bytes"
+from utils.backups import copy_database
 
-# Check if target database needs seeding
-if [ ! -f "$TARGET_DB" ]; then
-    echo "Target database not found, will seed"
-    NEEDS_SEED=1
-else
-    # Get target database size
-    TARGET_SIZE=$(stat -c%s "$TARGET_DB" 2>/dev/null || stat -f%z "$TARGET_DB" 2>/dev/null || echo 0)
-    echo "Existing database size: $TARGET_SIZE bytes"
-    
-    if [ "$TARGET_SIZE" -lt "$MIN_SIZE" ]; then
-        echo "Existing database is too small (< $MIN_SIZE bytes), likely empty"
-        NEEDS_SEED=1
-    else
-        echo "Database appears to have data, skipping seed"
-        NEEDS_SEED=0
+seed_db, target_db = sys.argv[1:3]
+
+
+def count_participants(path):
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        tables = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table'")}
+        return sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                   for table in ('users', 'results') if table in tables)
+    finally:
+        conn.close()
+
+
+if not os.path.exists(target_db):
+    leftovers = [p for p in (target_db + '-wal', target_db + '-shm') if os.path.exists(p)]
+    if leftovers:
+        # SQLite would replay a stray -wal into whatever file is created next
+        print(f"ERROR: {', '.join(leftovers)} found without {target_db}; "
+              "not seeding, move them away after checking them")
+        sys.exit(1)
+    print("Target database not found, will seed")
+else:
+    try:
+        rows = count_participants(target_db)
+    except sqlite3.DatabaseError as e:
+        print(f"ERROR: Existing database could not be read ({e}); not seeding")
+        sys.exit(1)
+    if rows:
+        print(f"Database has {rows} users/results rows, skipping seed")
+        sys.exit(0)
+    print("Existing database has no participants, will seed")
+
+# Written page by page through SQLite, so an existing -wal/-shm stays consistent
+copy_database(seed_db, target_db, pages=-1, pause=0, standalone=False)
+print(f"Database seeded successfully! ({count_participants(target_db)} users/results rows)")
+EOF
+    STATUS=$?
+    if [ "$STATUS" -ne 0 ]; then
+        exit "$STATUS"
     fi
 fi
 
-# Perform seeding if needed
-if [ "$NEEDS_SEED" = "1" ]; then
-    echo "Copying seed database..."
-    cp "$SEED_DB" "$TARGET_DB"
-    echo "Database seeded successfully!"
-    
-    # Verify copy
-    NEW_SIZE=$(stat -c%s "$TARGET_DB" 2>/dev/null || stat -f%z "$TARGET_DB" 2>/dev/null || echo 0)
-    echo "New database size: $NEW_SIZE bytes"
-else
-    echo "Database seeding not needed"
+echo "Database seeding check complete"
+
+# Pack answers still in the legacy responses table into answer_sets before
+# the workers start; a snapshot is taken first, and it is a no-op afterwards
+if [ -f "$TARGET_DB" ]; then
+    DATABASE_PATH="$TARGET_DB" python -m flask --app app migrate-answers --yes || exit 1
 fi
 
-echo "Database seeding check complete"
\ No newline at end of file
+# Fingerprinted, precompressed CSS/JS under static/dist (git-ignored, so
+# built here); without it asset_url() serves the unminified sources
+python -m flask --app app build-assets || exit 1
@@ -0,0 +1,63 @@
+"""score_batch() must agree with scorer.score() row by row, since flask
+rescore rewrites every stored result with it.
+
+Seeded random complete and partial answer sets are scored both ways;
+partial sets use '-' for the questions without an answer, as packed
+answer_sets rows do.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from utils.batch_scoring import (QUESTION_IDS, STYLE_LABELS, encode_patterns,
+                                 score_batch)
+from utils.scoring import scorer
+
+ANSWERS = 'ABCD'
+SAMPLE_SIZE = 20000
+
+
+def random_patterns(seed, missing):
+    rng = random.Random(seed)
+    patterns = []
+    for _ in range(SAMPLE_SIZE):
+        answers = [rng.choice(ANSWERS) for _ in QUESTION_IDS]
+        if missing:
+            for index in rng.sample(range(len(QUESTION_IDS)),
+                                    rng.randint(1, len(QUESTION_IDS))):
+                answers[index] = '-'
+        patterns.append(''.join(answers))
+    return patterns
+
+
+def assert_rows_match(patterns):
+    batch = score_batch(encode_patterns(patterns))
+    for row, pattern in enumerate(patterns):
+        expected = scorer.score(dict(zip(QUESTION_IDS, pattern)))
+        actual = {
+            'primary_style': batch['primary_style'][row],
+            'secondary_style': batch['secondary_style'][row],
+            'style_scores': dict(zip(STYLE_LABELS.tolist(),
+                                     batch['style_scores'][row].tolist())),
+            'adequacy_score': int(batch['adequacy_score'][row]),
+            'adequacy_level': batch['adequacy_level'][row],
+        }
+        assert actual == expected, pattern
+
+
+def test_random_complete_answer_sets():
+    assert_rows_match(random_patterns(20240401, missing=False))
+
+
+def test_random_partial_answer_sets():
+    assert_rows_match(random_patterns(20240402, missing=True))
+
+
+def test_uniform_and_empty_answer_sets():
+    assert_rows_match([answer * len(QUESTION_IDS) for answer in ANSWERS + '-'])
+
+
+def test_rejects_wrong_width():
+    with pytest.raises(ValueError):
+        score_batch(np.zeros((2, len(QUESTION_IDS) - 1), dtype=np.int8))
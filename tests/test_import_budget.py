@@ -0,0 +1,50 @@
+"""Importing the WSGI app must stay within its time and memory budget.
+
+Measured with ``python -X importtime -c "import wsgi"`` in fresh
+interpreters, as benchmarks/import_budget.py does. IMPORT_BUDGET_MS and
+IMPORT_BUDGET_RSS_MB override the budgets on slower machines.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.import_budget import ROOT, measure_once
+
+MAX_IMPORT_MS = float(os.environ.get('IMPORT_BUDGET_MS', 400))
+MAX_RSS_MB = float(os.environ.get('IMPORT_BUDGET_RSS_MB', 60))
+RUNS = 3
+# Only needed by exports, imports and analysis, which load them on use
+LAZY_MODULES = ('pandas', 'numpy', 'openpyxl', 'plotly')
+
+
+def _env(tmp_path):
+    return dict(os.environ, DATABASE_PATH=str(tmp_path / 'budget.db'))
+
+
+def test_wsgi_import_within_budget(tmp_path):
+    env = _env(tmp_path)
+    # First run warms the bytecode cache and is discarded
+    measure_once(env)
+    samples = [measure_once(env) for _ in range(RUNS)]
+
+    import_ms = statistics.median(s[0] for s in samples)
+    rss_mb = max(s[1] for s in samples)
+    assert import_ms <= MAX_IMPORT_MS, \
+        f"wsgi import took {import_ms:.0f} ms (budget {MAX_IMPORT_MS:.0f} ms)"
+    assert rss_mb <= MAX_RSS_MB, \
+        f"peak RSS after importing wsgi is {rss_mb:.1f} MB (budget {MAX_RSS_MB:.0f} MB)"
+
+
+def test_wsgi_import_leaves_heavy_modules_unloaded(tmp_path):
+    check = ("import sys, wsgi; "
+             f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    proc = subprocess.run([sys.executable, '-c', check], cwd=ROOT, env=_env(tmp_path),
+                          capture_output=True, text=True, check=True)
+    assert proc.stdout.strip() == ''
+
+
+def test_wsgi_import_does_not_create_the_database(tmp_path):
+    subprocess.run([sys.executable, '-c', 'import wsgi'], cwd=ROOT, env=_env(tmp_path),
+                   capture_output=True, check=True)
+    assert not (tmp_path / 'budget.db').exists()
@@ -0,0 +1,97 @@
+"""migrate_responses_to_answer_sets() must pack the legacy responses table
+into answer_sets without losing or reordering anyone's answers.
+"""
+import sqlite3
+import uuid
+
+import pytest
+
+from database import Database
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE responses (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        question_id INTEGER NOT NULL,
+        answer TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+'''
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / 'migrate.db'))
+    yield database
+    database.close()
+
+
+def add_legacy(db, rows):
+    """Insert (user_id, question_id, answer) rows in order, as the old
+    save_response did: one new row per answer, repeats included"""
+    conn = sqlite3.connect(db.db_path)
+    try:
+        conn.execute(LEGACY_SCHEMA)
+        conn.executemany(
+            "INSERT INTO responses (id, user_id, question_id, answer) VALUES (?, ?, ?, ?)",
+            [(str(uuid.uuid4()), user_id, question_id, answer)
+             for user_id, question_id, answer in rows])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def answers(db, user_id):
+    return {r['question_id']: r['answer'] for r in db.get_user_responses(user_id)}
+
+
+def test_nothing_to_migrate(db):
+    assert not db.has_legacy_responses()
+    assert db.migrate_responses_to_answer_sets() is None
+
+
+def test_legacy_answers_are_packed(db):
+    first = db.create_user('Ana', 'Pop', 'ana@example.com')
+    second = db.create_user('Ion', 'Rusu', 'ion@example.com')
+    add_legacy(db, [(first, q, 'ABCD'[q % 4]) for q in range(1, 13)]
+               + [(second, 1, 'b'), (second, 7, 'D')])
+    assert db.has_legacy_responses()
+
+    assert db.migrate_responses_to_answer_sets() == 2
+
+    assert not db.has_legacy_responses()
+    assert answers(db, first) == {q: 'ABCD'[q % 4] for q in range(1, 13)}
+    # Unanswered questions stay missing, answers are upper-cased
+    assert answers(db, second) == {1: 'B', 7: 'D'}
+
+
+def test_duplicate_answers_keep_the_latest(db):
+    user = db.create_user('Ana', 'Pop', 'ana@example.com')
+    add_legacy(db, [(user, 3, 'A'), (user, 4, 'C'), (user, 3, 'B'),
+                    (user, 4, 'A'), (user, 3, 'D')])
+
+    assert db.migrate_responses_to_answer_sets() == 1
+
+    assert answers(db, user) == {3: 'D', 4: 'A'}
+
+
+def test_existing_answer_sets_take_precedence(db):
+    user = db.create_user('Ana', 'Pop', 'ana@example.com')
+    # Answered after the upgrade, before the migration was run
+    db.save_responses(user, [(1, 'C'), (2, 'D')])
+    add_legacy(db, [(user, 1, 'A'), (user, 2, 'A'), (user, 3, 'B')])
+
+    assert db.migrate_responses_to_answer_sets() == 1
+
+    assert answers(db, user) == {1: 'C', 2: 'D', 3: 'B'}
+
+
+def test_migration_bumps_the_data_version(db):
+    user = db.create_user('Ana', 'Pop', 'ana@example.com')
+    add_legacy(db, [(user, 1, 'A')])
+    before = db.get_data_version()
+
+    db.migrate_responses_to_answer_sets()
+
+    assert db.get_data_version() > before
@@ -0,0 +1,73 @@
+"""scorer.score() must agree with the legacy per-function scoring.
+
+Every answer to every question is checked on its own, every combination
+of two questions exhaustively, and a large seeded random sample of
+complete and partial answer sets.
+"""
+import itertools
+import random
+
+import pytest
+
+from utils.scoring import AssessmentScorer, scorer
+
+QUESTIONS = range(1, 13)
+ANSWERS = 'ABCD'
+SAMPLE_SIZE = 50000
+
+
+def legacy_score(responses):
+    legacy = AssessmentScorer()
+    primary, secondary = legacy.calculate_style_scores(responses)
+    adequacy_score, adequacy_level = legacy.calculate_adequacy_score(responses)
+    style_scores = legacy.get_all_style_scores(
+        [{'question_id': q, 'answer': a} for q, a in responses.items()])
+    return {
+        'primary_style': primary,
+        'secondary_style': secondary,
+        'style_scores': style_scores,
+        'adequacy_score': adequacy_score,
+        'adequacy_level': adequacy_level,
+    }
+
+
+def assert_same(responses):
+    assert scorer.score(responses) == legacy_score(responses), responses
+
+
+def test_empty_responses():
+    assert_same({})
+
+
+@pytest.mark.parametrize('question', QUESTIONS)
+def test_every_single_answer(question):
+    for answer in ANSWERS:
+        assert_same({question: answer})
+
+
+def test_every_pair_of_questions():
+    for q1, q2 in itertools.combinations(QUESTIONS, 2):
+        for a1, a2 in itertools.product(ANSWERS, repeat=2):
+            assert_same({q1: a1, q2: a2})
+
+
+def test_uniform_answer_sets():
+    for answer in ANSWERS:
+        assert_same({q: answer for q in QUESTIONS})
+
+
+def test_random_complete_answer_sets():
+    rng = random.Random(20240301)
+    for _ in range(SAMPLE_SIZE):
+        assert_same({q: rng.choice(ANSWERS) for q in QUESTIONS})
+
+
+def test_random_partial_answer_sets():
+    rng = random.Random(20240302)
+    for _ in range(SAMPLE_SIZE // 5):
+        questions = rng.sample(list(QUESTIONS), rng.randint(1, 11))
+        assert_same({q: rng.choice(ANSWERS) for q in questions})
+
+
+def test_unknown_answers_score_nothing():
+    assert_same({1: 'E', 2: 'a', 3: '', 13: 'A'})
@@ -0,0 +1,185 @@
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Request bodies larger than this are spooled to a temporary file
+SPOOL_MAX_SIZE = 1024 * 1024
+# Response data gathered per thread hop; normal pages need a single hop
+RESPONSE_BATCH_BYTES = 64 * 1024
+
+
+class WsgiToAsgi:
+    """Serve a WSGI application from an ASGI server.
+
+    Connections, request bodies and response sending live on the event
+    loop, so an idle or slow client costs a coroutine instead of a thread.
+    The WSGI application itself, and with it every database call, runs in
+    a bounded thread pool and never on the loop. Requests beyond the pool
+    size wait in order on the loop.
+    """
+
+    def __init__(self, wsgi_app, max_threads=32, on_shutdown=()):
+        self.wsgi_app = wsgi_app
+        self.max_threads = max_threads
+        self.on_shutdown = list(on_shutdown)
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_threads,
+                                                thread_name_prefix='asgi')
+        return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                loop = asyncio.get_running_loop()
+                for callback in self.on_shutdown:
+                    await loop.run_in_executor(self.executor, callback)
+                if self._executor is not None:
+                    self._executor.shutdown(wait=True)
+                    self._executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    def environ(self, scope, body):
+        """PEP 3333 environ for an ASGI HTTP scope"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        # PATH_INFO is the percent-decoded path; WSGI strings are the UTF-8
+        # bytes decoded as latin-1, which Werkzeug turns back into text
+        path = scope['path']
+        root_path = scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = name
+            else:
+                key = f'HTTP_{name}'
+            # Repeated headers are joined, as a WSGI server would
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+
+        # The body is fully buffered, so its length is known even for
+        # chunked requests that carried no Content-Length
+        size = body.seek(0, 2)
+        body.seek(0)
+        environ['CONTENT_LENGTH'] = str(size)
+        return environ
+
+    @staticmethod
+    def _next_batch(iterator):
+        """Up to RESPONSE_BATCH_BYTES of body, and whether the body is done"""
+        chunks = []
+        size = 0
+        for chunk in iterator:
+            if chunk:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= RESPONSE_BATCH_BYTES:
+                    return b''.join(chunks), False
+        return b''.join(chunks), True
+
+    def _respond(self, environ, send_threadsafe):
+        """Run the application in a pool thread.
+
+        A response that fits in one batch is returned as (status, headers,
+        body) for the loop to send. Longer (streamed) responses are sent
+        from this thread, so the iterator and its request context are only
+        ever used on one thread; None is returned then.
+        """
+        state = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and state.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            state['status'] = int(status.split(' ', 1)[0])
+            state['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                for name, value in headers]
+
+        iterable = self.wsgi_app(environ, start_response)
+        try:
+            iterator = iter(iterable)
+            data, done = self._next_batch(iterator)
+            if done:
+                return state['status'], state['headers'], data
+
+            state['sent'] = True
+            send_threadsafe({'type': 'http.response.start',
+                             'status': state['status'],
+                             'headers': state['headers']})
+            while True:
+                send_threadsafe({'type': 'http.response.body', 'body': data,
+                                 'more_body': not done})
+                if done:
+                    return None
+                data, done = self._next_batch(iterator)
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    async def _http(self, scope, receive, send):
+        body = await self._read_body(receive)
+        if body is None:
+            return
+
+        loop = asyncio.get_running_loop()
+
+        def send_threadsafe(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        try:
+            response = await loop.run_in_executor(
+                self.executor, self._respond, self.environ(scope, body), send_threadsafe)
+            if response is not None:
+                status, headers, data = response
+                await send({'type': 'http.response.start', 'status': status,
+                            'headers': headers})
+                await send({'type': 'http.response.body', 'body': data})
+        finally:
+            body.close()
@@ -0,0 +1,196 @@
+import fcntl
+import glob
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+SNAPSHOT_PATTERN = 'snapshot-*.db'
+# Pages copied per backup step (4 MB with the default 4 KB page size) and
+# the pause between steps, so other connections get the disk in between
+PAGES_PER_STEP = 1024
+STEP_PAUSE = 0.01
+
+
+def snapshot_dir(db_path):
+    """Where snapshots of db_path are kept; BACKUP_DIR overrides it"""
+    return os.environ.get('BACKUP_DIR',
+                          os.path.join(os.path.dirname(db_path) or '.', 'backups'))
+
+
+def copy_database(source_path, target_path, pages=PAGES_PER_STEP, pause=STEP_PAUSE,
+                  standalone=True):
+    """Copy a live SQLite database with the online backup API.
+
+    The source is read inside one read transaction, so in WAL mode the
+    copy is a consistent point-in-time image that concurrent writers never
+    restart or wait for. With `standalone` the copy is switched out of WAL
+    mode, so it is a single self-contained file.
+    """
+    # connect() would silently create an empty source database
+    if not os.path.isfile(source_path):
+        raise FileNotFoundError(f"No database at {source_path}")
+    source = sqlite3.connect(source_path, timeout=30)
+    target = sqlite3.connect(target_path, timeout=30)
+
+    def step(status, remaining, total):
+        if remaining and pause:
+            time.sleep(pause)
+
+    try:
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=pages, progress=step)
+        source.rollback()
+        if standalone:
+            target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+        source.close()
+
+
+def list_snapshots(directory):
+    """Snapshot files in `directory`, newest first"""
+    return sorted(glob.glob(os.path.join(directory, SNAPSHOT_PATTERN)), reverse=True)
+
+
+def latest_snapshot(directory):
+    snapshots = list_snapshots(directory)
+    return snapshots[0] if snapshots else None
+
+
+def take_snapshot(db_path, directory=None, keep=None):
+    """Write a new snapshot of db_path and prune the oldest beyond `keep`.
+
+    Returns the snapshot's path.
+    """
+    directory = directory or snapshot_dir(db_path)
+    os.makedirs(directory, exist_ok=True)
+    # UTC timestamps sort in creation order
+    name = f"snapshot-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S-%f')}.db"
+    path = os.path.join(directory, name)
+    tmp_path = f'{path}.tmp'
+    try:
+        copy_database(db_path, tmp_path)
+        check = sqlite3.connect(tmp_path)
+        try:
+            result = check.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            check.close()
+        if result != 'ok':
+            raise sqlite3.DatabaseError(f"Snapshot failed its integrity check: {result}")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if keep:
+        for old in list_snapshots(directory)[keep:]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return path
+
+
+def restore_snapshot(snapshot_path, db_path):
+    """Replace the contents of db_path with a snapshot, in place.
+
+    Other connections keep working and see the restored data after their
+    current transaction. The data version is moved past its pre-restore
+    value so nothing cached for the replaced data is served again.
+    """
+    if not os.path.isfile(snapshot_path):
+        raise FileNotFoundError(f"No snapshot at {snapshot_path}")
+    check = sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True)
+    try:
+        result = check.execute("PRAGMA quick_check").fetchone()[0]
+        has_data = check.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name IN ('users', 'results', 'meta')"
+        ).fetchone()[0] == 3
+    finally:
+        check.close()
+    if result != 'ok' or not has_data:
+        raise sqlite3.DatabaseError(f"{snapshot_path} is not a usable snapshot ({result})")
+
+    live = sqlite3.connect(db_path, timeout=30)
+    try:
+        row = live.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+        version = row[0] if row else 0
+    except sqlite3.OperationalError:
+        version = 0
+    finally:
+        live.close()
+
+    # One step: the destination stays write-locked until the copy is complete
+    copy_database(snapshot_path, db_path, pages=-1, pause=0, standalone=False)
+
+    live = sqlite3.connect(db_path, timeout=30)
+    try:
+        live.execute(
+            "UPDATE meta SET value = MAX(value, ?) + 1 WHERE key = 'data_version'",
+            (version,))
+        live.commit()
+    finally:
+        live.close()
+
+
+class SnapshotScheduler:
+    """Take a snapshot every `interval` seconds from a background thread.
+
+    Every gunicorn worker runs the thread; a lock file in the snapshot
+    directory and the age of the newest snapshot make sure only one of
+    them takes each snapshot.
+    """
+
+    def __init__(self, db, interval, keep=24):
+        self.db = db
+        self.interval = interval
+        self.keep = keep
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return snapshot_dir(self.db.db_path)
+
+    def ensure_running(self):
+        """Start the thread in this process, once; cheap to call per request"""
+        if not self.interval or (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._loop, name='snapshots',
+                                                daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def _due(self):
+        latest = latest_snapshot(self.directory)
+        return latest is None or time.time() - os.path.getmtime(latest) >= self.interval
+
+    def _loop(self):
+        while True:
+            time.sleep(min(self.interval, 60))
+            try:
+                self.run_if_due()
+            except Exception as e:
+                print(f"⚠️  Scheduled snapshot failed: {e}")
+
+    def run_if_due(self):
+        """Take a snapshot unless a recent one exists or another process is
+        taking one; returns its path or None"""
+        if not self._due():
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.snapshot.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            # Another worker may have finished one while we waited
+            if not self._due():
+                return None
+            return take_snapshot(self.db.db_path, self.directory, self.keep)
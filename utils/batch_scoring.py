@@ -0,0 +1,121 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from utils.scoring import (ADEQUACY_TABLE, STYLE_KEYS, STYLE_NAMES,
+                           STYLE_TABLE)
+
+ANSWER_CODES = "ABCD"
+# Code used in answer matrices for a question with no stored answer
+MISSING = len(ANSWER_CODES)
+
+QUESTION_IDS = tuple(sorted({int(q) for q, _ in STYLE_TABLE}))
+
+STYLE_LABELS = np.array([STYLE_NAMES[style] for style in STYLE_KEYS])
+
+
+def _compile_tables() -> Tuple[np.ndarray, np.ndarray]:
+    # style_points[q, code, s] is how many points answer `code` to question
+    # `q` gives style `s`; the extra MISSING code contributes nothing
+    style_points = np.zeros(
+        (len(QUESTION_IDS), len(ANSWER_CODES) + 1, len(STYLE_KEYS)),
+        dtype=np.int16)
+    adequacy_points = np.zeros((len(QUESTION_IDS), len(ANSWER_CODES) + 1),
+                               dtype=np.int16)
+
+    for q_index, question in enumerate(QUESTION_IDS):
+        for code, answer in enumerate(ANSWER_CODES):
+            key = (str(question), answer)
+            for style_index in STYLE_TABLE.get(key, ()):
+                style_points[q_index, code, style_index] += 1
+            adequacy_points[q_index, code] = ADEQUACY_TABLE.get(key, 0)
+
+    return style_points, adequacy_points
+
+
+STYLE_POINTS, ADEQUACY_POINTS = _compile_tables()
+
+# Byte value -> answer code, for decoding packed "ABCD..." strings
+_BYTE_CODES = np.full(256, MISSING, dtype=np.int8)
+for _code, _answer in enumerate(ANSWER_CODES):
+    _BYTE_CODES[ord(_answer)] = _code
+    _BYTE_CODES[ord(_answer.lower())] = _code
+
+
+def encode_patterns(patterns: List[str]) -> np.ndarray:
+    """Turn fixed-width answer strings ("ABDC...", '-' for missing) into an
+    N x len(QUESTION_IDS) matrix of answer codes."""
+    width = len(QUESTION_IDS)
+    if not patterns:
+        return np.empty((0, width), dtype=np.int8)
+    raw = np.frombuffer("".join(patterns).encode("ascii"), dtype=np.uint8)
+    return _BYTE_CODES[raw].reshape(-1, width)
+
+
+def encode_responses(responses: Iterable[Dict[int, str]]) -> np.ndarray:
+    """Build an answer matrix from {question_id: answer} dicts."""
+    return encode_patterns([
+        "".join(r.get(q, r.get(str(q), "-")) or "-" for q in QUESTION_IDS)
+        for r in responses
+    ])
+
+
+def adequacy_levels(scores: np.ndarray) -> np.ndarray:
+    return np.select([(scores >= 20) & (scores <= 24),
+                      (scores >= 10) & (scores <= 19)], ["Excelent", "Bun"],
+                     "Necesită dezvoltare")
+
+
+def score_batch(answers: np.ndarray) -> Dict[str, np.ndarray]:
+    """Score an N x 12 matrix of answer codes (0-3 for A-D, MISSING for none).
+
+    Returns arrays matching AssessmentScorer.score() row by row:
+    style_scores (N x 4, in STYLE_KEYS order), primary_style,
+    secondary_style, adequacy_score and adequacy_level.
+    """
+    answers = np.asarray(answers)
+    if answers.ndim != 2 or answers.shape[1] != len(QUESTION_IDS):
+        raise ValueError(
+            f"Expected an N x {len(QUESTION_IDS)} answer matrix, got {answers.shape}")
+
+    q_index = np.arange(len(QUESTION_IDS))
+    style_scores = STYLE_POINTS[q_index, answers].sum(axis=1, dtype=np.int32)
+    adequacy_score = ADEQUACY_POINTS[q_index, answers].sum(axis=1,
+                                                           dtype=np.int32)
+
+    # Stable sort on the negated counts keeps the lowest style key first on ties
+    ranked = np.argsort(-style_scores, axis=1, kind="stable")
+
+    return {
+        "style_scores": style_scores,
+        "primary_style": STYLE_LABELS[ranked[:, 0]],
+        "secondary_style": STYLE_LABELS[ranked[:, 1]],
+        "adequacy_score": adequacy_score,
+        "adequacy_level": adequacy_levels(adequacy_score)
+    }
+
+
+def rescore_database(db, chunk_size: int = 50000, progress=None):
+    """Recompute every stored result from its responses, chunk by chunk.
+
+    Returns (scanned, changed): the participants scored and the result rows
+    whose scores actually changed. progress is called with the scanned count.
+    """
+    total = 0
+    changed = 0
+    for chunk in db.iter_answer_patterns(QUESTION_IDS, chunk_size):
+        scores = score_batch(encode_patterns([p for _, p in chunk]))
+
+        changed += db.update_results_bulk(
+            (primary, secondary, adequacy, level, *style_scores, user_id)
+            for (user_id, _), primary, secondary, adequacy, level, style_scores
+            in zip(chunk, scores["primary_style"].tolist(),
+                   scores["secondary_style"].tolist(),
+                   scores["adequacy_score"].tolist(),
+                   scores["adequacy_level"].tolist(),
+                   scores["style_scores"].tolist()))
+
+        total += len(chunk)
+        if progress:
+            progress(total)
+    return total, changed
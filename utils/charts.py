@@ -0,0 +1,150 @@
+import math
+
+from markupsafe import Markup, escape
+
+STYLE_LABELS = ('Directiv', 'Informativ', 'Participativ', 'Delegativ')
+# Same blues the Plotly charts used, one per style
+STYLE_COLORS = ('#0061FE', '#3B82F6', '#93BBFD', '#DBEAFE')
+# Cycled through for comparison series
+SERIES_COLORS = ('#0061FE', '#165C7D', '#6B5B95', '#93BBFD', '#4A5568',
+                 '#3B82F6', '#959DA5', '#0A1628')
+FONT = 'font-family="-apple-system,Segoe UI,Roboto,Arial,sans-serif"'
+TEXT_COLOR = '#0A1628'
+MUTED_COLOR = '#586069'
+
+
+def _svg(width, height, title, body):
+    return Markup(
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'width="100%" role="img" aria-label="{escape(title)}" {FONT}>'
+        f'<title>{escape(title)}</title>'
+        f'<text x="{width / 2:g}" y="22" text-anchor="middle" font-size="15" '
+        f'fill="{TEXT_COLOR}">{escape(title)}</text>'
+        f'{body}</svg>')
+
+
+def _legend(x, y, entries):
+    items = []
+    for index, (label, color) in enumerate(entries):
+        top = y + index * 22
+        items.append(
+            f'<rect x="{x}" y="{top}" width="12" height="12" rx="2" fill="{color}"/>'
+            f'<text x="{x + 18}" y="{top + 11}" font-size="12" '
+            f'fill="{TEXT_COLOR}">{escape(label)}</text>')
+    return ''.join(items)
+
+
+def _point(cx, cy, radius, angle):
+    # Angles start at 12 o'clock and run clockwise
+    return (cx + radius * math.sin(angle), cy - radius * math.cos(angle))
+
+
+def donut_chart(labels, values, colors=STYLE_COLORS, title='', hole=0.4):
+    """Share of each value as a donut, with a percentage legend"""
+    width, height = 480, 300
+    cx, cy, outer = 150, 165, 115
+    inner = outer * hole
+    total = sum(v or 0 for v in values)
+
+    slices = []
+    if total <= 0:
+        slices.append(
+            f'<circle cx="{cx}" cy="{cy}" r="{(outer + inner) / 2:g}" fill="none" '
+            f'stroke="#E1E4E8" stroke-width="{outer - inner:g}"/>')
+    else:
+        start = 0.0
+        for value, color in zip(values, colors):
+            if not value:
+                continue
+            sweep = 2 * math.pi * value / total
+            if sweep >= 2 * math.pi - 1e-9:
+                # A full circle cannot be drawn as a single arc
+                slices.append(
+                    f'<circle cx="{cx}" cy="{cy}" r="{(outer + inner) / 2:g}" '
+                    f'fill="none" stroke="{color}" stroke-width="{outer - inner:g}"/>')
+                break
+            end = start + sweep
+            large = 1 if sweep > math.pi else 0
+            x1, y1 = _point(cx, cy, outer, start)
+            x2, y2 = _point(cx, cy, outer, end)
+            x3, y3 = _point(cx, cy, inner, end)
+            x4, y4 = _point(cx, cy, inner, start)
+            slices.append(
+                f'<path d="M{x1:.1f},{y1:.1f}A{outer},{outer} 0 {large} 1 {x2:.1f},{y2:.1f}'
+                f'L{x3:.1f},{y3:.1f}A{inner:g},{inner:g} 0 {large} 0 {x4:.1f},{y4:.1f}Z" '
+                f'fill="{color}" stroke="#FFFFFF" stroke-width="1"/>')
+            start = end
+
+    entries = [
+        (f'{label} {round(100 * (value or 0) / total) if total else 0}%', color)
+        for label, value, color in zip(labels, values, colors)
+    ]
+    return _svg(width, height, title,
+                ''.join(slices) + _legend(310, 120, entries))
+
+
+def _axis_max(values):
+    top = max([v or 0 for v in values] + [1])
+    step = max(1, math.ceil(top / 6))
+    return step * math.ceil(top / step), step
+
+
+def bar_chart(categories, series, title='', y_title='Scor', colors=None):
+    """Vertical bars; several series are drawn as grouped bars with a legend.
+
+    series is a list of (name, values) pairs, one value per category. With
+    a single series, `colors` may give one color per category instead.
+    """
+    legend = len(series) > 1
+    width = 480 if not legend else 600
+    height = 300
+    left, right, top, bottom = 48, (width - 140 if legend else width - 16), 40, 260
+    top_value, step = _axis_max([v for _, values in series for v in values])
+    scale = (bottom - top) / top_value
+
+    parts = []
+    for tick in range(0, top_value + 1, step):
+        y = bottom - tick * scale
+        parts.append(
+            f'<line x1="{left}" y1="{y:.1f}" x2="{right}" y2="{y:.1f}" stroke="#E1E4E8"/>'
+            f'<text x="{left - 6}" y="{y + 4:.1f}" text-anchor="end" font-size="11" '
+            f'fill="{MUTED_COLOR}">{tick}</text>')
+    parts.append(
+        f'<text x="14" y="{(top + bottom) / 2:g}" font-size="12" fill="{MUTED_COLOR}" '
+        f'text-anchor="middle" transform="rotate(-90 14 {(top + bottom) / 2:g})">'
+        f'{escape(y_title)}</text>')
+
+    group_width = (right - left) / max(len(categories), 1)
+    bar_width = group_width * 0.7 / max(len(series), 1)
+    for c_index, category in enumerate(categories):
+        group_left = left + c_index * group_width + group_width * 0.15
+        for s_index, (_, values) in enumerate(series):
+            value = values[c_index] or 0
+            if colors and not legend:
+                color = colors[c_index % len(colors)]
+            else:
+                color = SERIES_COLORS[s_index % len(SERIES_COLORS)]
+            x = group_left + s_index * bar_width
+            bar_height = value * scale
+            parts.append(
+                f'<rect x="{x:.1f}" y="{bottom - bar_height:.1f}" width="{bar_width * 0.92:.1f}" '
+                f'height="{bar_height:.1f}" fill="{color}"><title>{escape(category)}: '
+                f'{value}</title></rect>')
+        parts.append(
+            f'<text x="{left + (c_index + 0.5) * group_width:.1f}" y="{bottom + 18}" '
+            f'text-anchor="middle" font-size="12" fill="{TEXT_COLOR}">{escape(category)}</text>')
+
+    if legend:
+        parts.append(_legend(right + 16, top + 4, [
+            (name, SERIES_COLORS[index % len(SERIES_COLORS)])
+            for index, (name, _) in enumerate(series)
+        ]))
+    return _svg(width, height, title, ''.join(parts))
+
+
+def style_scores(result):
+    """The four style scores of a result row, in STYLE_LABELS order"""
+    return [result.get('directiv_score') or 0,
+            result.get('informativ_score') or 0,
+            result.get('participativ_score') or 0,
+            result.get('delegativ_score') or 0]
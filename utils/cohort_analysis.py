@@ -0,0 +1,183 @@
+from typing import Dict, List
+
+import numpy as np
+
+from utils.batch_scoring import (ANSWER_CODES, MISSING, QUESTION_IDS,
+                                 encode_patterns)
+
+# Question order of the answer patterns analyze_cohort() expects
+ANSWER_QUESTION_IDS = QUESTION_IDS
+
+# Score features used for distances and clustering, with their possible
+# ranges so every feature is scaled to [0, 1] before comparing profiles
+SCORE_FEATURES = ('directiv_score', 'informativ_score', 'participativ_score',
+                  'delegativ_score', 'adequacy_score')
+SCORE_MINIMUMS = np.array([0, 0, 0, 0, -24], dtype=np.float32)
+SCORE_RANGES = np.array([12, 12, 12, 12, 48], dtype=np.float32)
+
+# Full N x N matrices are only returned for cohorts up to this size; larger
+# cohorts get nearest neighbours instead
+MATRIX_LIMIT = 300
+# Rows of the distance matrix computed at a time, bounding memory use
+BLOCK_SIZE = 1024
+
+
+def score_features(profiles: List[Dict]) -> np.ndarray:
+    """N x 5 matrix of style and adequacy scores scaled to [0, 1]"""
+    raw = np.array([[p.get(name) or 0 for name in SCORE_FEATURES]
+                    for p in profiles],
+                   dtype=np.float32).reshape(-1, len(SCORE_FEATURES))
+    return (raw - SCORE_MINIMUMS) / SCORE_RANGES
+
+
+def answer_features(patterns: List[str]) -> np.ndarray:
+    """One-hot N x (12 * 4) matrix of answers; missing answers are all zero"""
+    codes = encode_patterns(patterns)
+    onehot = np.zeros((codes.shape[0], codes.shape[1], len(ANSWER_CODES) + 1),
+                      dtype=np.float32)
+    np.put_along_axis(onehot, codes[:, :, None].astype(np.intp), 1, axis=2)
+    return onehot[:, :, :MISSING].reshape(codes.shape[0], -1)
+
+
+def score_distances(features: np.ndarray, rows: slice = slice(None)) -> np.ndarray:
+    """Euclidean distances between scaled profiles, normalised to [0, 1]"""
+    block = features[rows]
+    squared = ((block * block).sum(axis=1)[:, None]
+               + (features * features).sum(axis=1)[None, :]
+               - 2 * block @ features.T)
+    return np.sqrt(np.maximum(squared, 0)) / np.sqrt(features.shape[1])
+
+
+def answer_agreement(onehot: np.ndarray, rows: slice = slice(None)) -> np.ndarray:
+    """Share of questions on which two participants gave the same answer"""
+    questions = onehot.shape[1] // len(ANSWER_CODES)
+    return onehot[rows] @ onehot.T / questions
+
+
+def nearest_neighbours(features: np.ndarray, onehot: np.ndarray,
+                       count: int = 5) -> Dict[str, np.ndarray]:
+    """Indices of each participant's closest profiles, computed in blocks"""
+    n = features.shape[0]
+    count = min(count, n - 1)
+    indices = np.empty((n, count), dtype=np.intp)
+    distances = np.empty((n, count), dtype=np.float32)
+    agreement = np.empty((n, count), dtype=np.float32)
+
+    for start in range(0, n, BLOCK_SIZE):
+        rows = slice(start, min(start + BLOCK_SIZE, n))
+        block = score_distances(features, rows)
+        # Never report a participant as their own neighbour
+        local = np.arange(block.shape[0])
+        block[local, local + start] = np.inf
+
+        nearest = np.argpartition(block, count - 1, axis=1)[:, :count]
+        order = np.argsort(np.take_along_axis(block, nearest, axis=1),
+                           axis=1, kind='stable')
+        nearest = np.take_along_axis(nearest, order, axis=1)
+
+        indices[rows] = nearest
+        distances[rows] = np.take_along_axis(block, nearest, axis=1)
+        agreement[rows] = (onehot[rows][:, None, :] * onehot[nearest]).sum(
+            axis=2) / (onehot.shape[1] // len(ANSWER_CODES))
+
+    return {'indices': indices, 'distances': distances, 'agreement': agreement}
+
+
+def kmeans(features: np.ndarray, k: int, iterations: int = 100,
+           seed: int = 0) -> Dict[str, np.ndarray]:
+    """Lloyd's k-means with k-means++ seeding; deterministic for a given seed"""
+    n = features.shape[0]
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+
+    centroids = np.empty((k, features.shape[1]), dtype=features.dtype)
+    centroids[0] = features[rng.integers(n)]
+    closest = ((features - centroids[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = closest.sum()
+        # Identical profiles leave nothing to spread over; fall back to uniform
+        choice = (rng.choice(n, p=closest / total) if total > 0
+                  else rng.integers(n))
+        centroids[i] = features[choice]
+        closest = np.minimum(closest,
+                             ((features - centroids[i]) ** 2).sum(axis=1))
+
+    labels = np.full(n, -1, dtype=np.intp)
+    for _ in range(iterations):
+        squared = ((features[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        new_labels = squared.argmin(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, features)
+        sizes = np.bincount(labels, minlength=k)
+        # Empty clusters keep their previous centroid
+        filled = sizes > 0
+        centroids[filled] = sums[filled] / sizes[filled, None]
+
+    inertia = float(((features - centroids[labels]) ** 2).sum())
+    return {'labels': labels, 'centroids': centroids, 'inertia': inertia}
+
+
+def analyze_cohort(profiles: List[Dict], clusters: int = 4,
+                   neighbours: int = 5) -> Dict:
+    """Similarity, nearest neighbours and clusters for a list of profiles.
+
+    Profiles are dicts as returned by Database.get_cohort_profiles(). Score
+    distance compares the four style scores and the adequacy score;
+    answer agreement compares the raw answers question by question.
+    """
+    features = score_features(profiles)
+    onehot = answer_features([p['answers'] for p in profiles])
+    ids = [p['user_id'] for p in profiles]
+    n = len(profiles)
+
+    analysis = {'count': n}
+
+    if n <= MATRIX_LIMIT:
+        distance = score_distances(features)
+        np.fill_diagonal(distance, 0)
+        # float64 before rounding, so the JSON carries 0.167 not 0.16699999
+        analysis['score_similarity'] = np.round(
+            1 - distance.astype(np.float64), 3).tolist()
+        analysis['answer_agreement'] = np.round(
+            answer_agreement(onehot).astype(np.float64), 3).tolist()
+
+    if n > 1 and neighbours > 0:
+        nearest = nearest_neighbours(features, onehot, neighbours)
+        analysis['neighbours'] = {
+            ids[i]: [{'id': ids[j],
+                      'score_similarity': round(1 - float(d), 3),
+                      'answer_agreement': round(float(a), 3)}
+                     for j, d, a in zip(row, dist, agree)]
+            for i, (row, dist, agree) in enumerate(zip(
+                nearest['indices'], nearest['distances'], nearest['agreement']))
+        }
+
+    result = kmeans(features, clusters)
+    labels = result['labels']
+    primary = np.array([p['primary_style'] for p in profiles])
+    cluster_list = []
+    for index, centroid in enumerate(result['centroids']):
+        members = np.flatnonzero(labels == index)
+        if not len(members):
+            continue
+        styles, counts = np.unique(primary[members], return_counts=True)
+        cluster_list.append({
+            'id': len(cluster_list),
+            'size': int(len(members)),
+            'dominant_style': str(styles[counts.argmax()]),
+            'centroid': dict(zip(SCORE_FEATURES, np.round(
+                centroid.astype(np.float64) * SCORE_RANGES + SCORE_MINIMUMS,
+                2).tolist())),
+            'members': [ids[i] for i in members],
+        })
+    cluster_list.sort(key=lambda c: -c['size'])
+    for position, cluster in enumerate(cluster_list):
+        cluster['id'] = position
+
+    analysis['clusters'] = cluster_list
+    analysis['inertia'] = round(result['inertia'], 4)
+    return analysis
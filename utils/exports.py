@@ -0,0 +1,164 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Job rows, and cached workbooks not used for this long, are removed
+JOB_MAX_AGE = 24 * 3600
+
+
+def write_results_workbook(path, columns, chunks, progress=None):
+    """Write export rows to an .xlsx file in xlsxwriter's constant-memory mode.
+
+    Rows are flushed to disk as they are written, so memory use does not
+    grow with the number of participants.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    try:
+        worksheet = workbook.add_worksheet('Results')
+        header = workbook.add_format({'bold': True, 'border': 1})
+        worksheet.write_row(0, 0, columns, header)
+
+        row_index = 1
+        for chunk in chunks:
+            for row in chunk:
+                worksheet.write_row(row_index, 0, row)
+                row_index += 1
+            if progress:
+                progress(row_index - 1)
+    finally:
+        workbook.close()
+    return row_index - 1
+
+
+class ExportJobs:
+    """Run Excel exports off the request thread and cache the files.
+
+    Finished workbooks are cached on disk under a name that includes the
+    database's data version and the export filters, so an unchanged
+    dataset is served straight from the cache. Job state lives in the
+    export_jobs table so any worker can answer status polls. Rows are read
+    from `read_db()` when given (e.g. the latest snapshot), else from `db`.
+    Jobs older than JOB_MAX_AGE, and workbooks unused for as long, are
+    removed whenever a new export starts.
+    """
+
+    max_workers = 2
+
+    def __init__(self, db, cache_dir=None, read_db=None):
+        self.db = db
+        self._read_db = read_db or (lambda: db)
+        self._cache_dir = cache_dir
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_dir(self):
+        if self._cache_dir is None:
+            self._cache_dir = os.environ.get(
+                'EXPORT_CACHE_DIR',
+                os.path.join(os.path.dirname(self.db.db_path) or '.',
+                             'exports'))
+        return self._cache_dir
+
+    def _executor_for_process(self):
+        # Created lazily so each forked gunicorn worker gets its own threads
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='export')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def cache_path(self, version, filters):
+        key = hashlib.sha1(
+            json.dumps(filters, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f'results_v{version}_{key}.xlsx')
+
+    def cached_file(self, filters):
+        """Path of an up-to-date cached workbook for these filters, or None"""
+        path = self.cache_path(self._read_db().get_data_version(), filters)
+        return path if os.path.exists(path) else None
+
+    def build(self, filters, progress=None):
+        """Build (or reuse) the workbook for the current data version"""
+        # Read the version before the rows: a file is only ever served while
+        # the version is unchanged, so it can never be stale. A snapshot at
+        # version N holds the same data the live database had at N
+        source = self._read_db()
+        version = source.get_data_version()
+        path = self.cache_path(version, filters)
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            write_results_workbook(tmp_path, source.EXPORT_COLUMNS,
+                                   source.iter_export_rows(**filters),
+                                   progress)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._remove_stale(version)
+        return path
+
+    def _remove_stale(self, version):
+        for old in glob.glob(os.path.join(self.cache_dir, 'results_v*.xlsx')):
+            if not os.path.basename(old).startswith(f'results_v{version}_'):
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def _remove_expired(self):
+        self.db.purge_export_jobs(JOB_MAX_AGE)
+        cutoff = time.time() - JOB_MAX_AGE
+        for old in glob.glob(os.path.join(self.cache_dir, 'results_v*.xlsx')):
+            try:
+                if os.path.getmtime(old) < cutoff:
+                    os.remove(old)
+            except OSError:
+                pass
+
+    def start(self, filters):
+        """Queue an export and return its job ID"""
+        job_id = str(uuid.uuid4())
+        self._remove_expired()
+        cached = self.cached_file(filters)
+        if cached:
+            # Marks the file as used, so it outlives the job served from it
+            os.utime(cached)
+            total = self._read_db().count_export_rows(**filters)
+            self.db.create_export_job(job_id, status='done', file_path=cached,
+                                      total=total)
+            return job_id
+
+        self.db.create_export_job(job_id)
+        self._executor_for_process().submit(self._run, job_id, filters)
+        return job_id
+
+    def _run(self, job_id, filters):
+        try:
+            total = self._read_db().count_export_rows(**filters)
+            self.db.update_export_job(job_id, status='running', total=total)
+            path = self.build(
+                filters,
+                progress=lambda done: self.db.update_export_job(
+                    job_id, progress=done))
+            self.db.update_export_job(job_id,
+                                      status='done',
+                                      progress=total,
+                                      file_path=path)
+        except Exception as e:
+            self.db.update_export_job(job_id, status='failed', error=str(e))
@@ -0,0 +1,155 @@
+import csv
+import io
+import os
+import re
+
+from assets.test_data import QUESTIONS
+
+# Header names accepted for the participant columns (compared lower-case).
+# A single full-name column may be used instead of first/last name
+NAME_COLUMNS = {
+    'first_name': ('first_name', 'first name', 'prenume'),
+    'last_name': ('last_name', 'last name', 'nume'),
+    'name': ('name', 'full name', 'nume complet', 'nume si prenume', 'nume și prenume'),
+    'email': ('email', 'e-mail'),
+}
+# Question columns: "1", "Q1", "q 1", "Întrebarea 1", ...
+_QUESTION_HEADER = re.compile(r'^(?:q|intrebarea|întrebarea)?\s*\.?\s*(\d+)$')
+QUESTION_OPTIONS = {q['id']: frozenset(q['options']) for q in QUESTIONS}
+# Rows reported back in detail; later errors are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def read_rows(stream, filename):
+    """Yield the rows of an uploaded .csv or .xlsx file as lists of cells.
+
+    `stream` is a binary file object. Spreadsheets are read with openpyxl in
+    read-only mode, which streams rows instead of loading the whole sheet.
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+    elif extension == '.csv':
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        sample = text.read(4096)
+        text.seek(0)
+        # Spreadsheet programs in some locales save CSV with semicolons
+        delimiter = ';' if sample.count(';') > sample.count(',') else ','
+        yield from csv.reader(text, delimiter=delimiter)
+    else:
+        raise ValueError('Unsupported file type, expected .csv or .xlsx')
+
+
+def _cell(row, index):
+    value = row[index] if index < len(row) else None
+    return '' if value is None else str(value).strip()
+
+
+def column_map(header, question_ids):
+    """{field or question ID: column index} for a header row"""
+    columns = {}
+    for index, cell in enumerate(header):
+        name = str(cell or '').strip().lower()
+        for field, aliases in NAME_COLUMNS.items():
+            if name in aliases:
+                columns.setdefault(field, index)
+        match = _QUESTION_HEADER.match(name)
+        if match and int(match.group(1)) in question_ids:
+            columns.setdefault(int(match.group(1)), index)
+
+    missing = [str(q) for q in question_ids if q not in columns]
+    if 'email' not in columns:
+        missing.insert(0, 'email')
+    if 'name' not in columns and not ('first_name' in columns and 'last_name' in columns):
+        missing.insert(0, 'first_name/last_name')
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return columns
+
+
+def parse_row(row, columns, question_ids, validate_email):
+    """(first_name, last_name, email, packed answers) or ValueError"""
+    if 'first_name' in columns and 'last_name' in columns:
+        first_name = _cell(row, columns['first_name'])
+        last_name = _cell(row, columns['last_name'])
+    else:
+        first_name, _, last_name = _cell(row, columns['name']).rpartition(' ')
+    if not first_name or not last_name:
+        raise ValueError('First and last name are required')
+
+    email = _cell(row, columns['email'])
+    if not validate_email(email):
+        raise ValueError(f"Invalid email format: '{email}'")
+
+    answers = []
+    for question_id in question_ids:
+        answer = _cell(row, columns[question_id]).upper()
+        if answer not in QUESTION_OPTIONS.get(question_id, ()):
+            raise ValueError(f"Question {question_id}: "
+                             + (f"invalid answer '{answer}'" if answer else 'no answer'))
+        answers.append(answer)
+    return first_name, last_name, email, ''.join(answers)
+
+
+def import_responses(db, rows, chunk_size=5000, progress=None):
+    """Validate, score and store completed questionnaires.
+
+    `rows` is an iterable of cell lists whose first non-empty row is the
+    header (see read_rows). Valid rows are scored with the batch scorer and
+    written chunk by chunk, one transaction per chunk; invalid rows are
+    reported with their line number and skipped. Returns
+    {'imported', 'failed', 'errors': [(line, message)]}.
+    """
+    # NumPy is only needed once something is actually imported
+    from utils.batch_scoring import encode_patterns, score_batch
+
+    question_ids = db.QUESTION_IDS
+    summary = {'imported': 0, 'failed': 0, 'errors': []}
+    columns = None
+    pending = []
+
+    def flush():
+        scores = score_batch(encode_patterns([row[3] for row in pending]))
+        db.import_participants(
+            (*row, primary, secondary, adequacy, level, *style_scores)
+            for row, primary, secondary, adequacy, level, style_scores in zip(
+                pending, scores['primary_style'].tolist(),
+                scores['secondary_style'].tolist(),
+                scores['adequacy_score'].tolist(),
+                scores['adequacy_level'].tolist(),
+                scores['style_scores'].tolist()))
+        summary['imported'] += len(pending)
+        pending.clear()
+        if progress:
+            progress(summary['imported'])
+
+    for line, row in enumerate(rows, start=1):
+        if not any(_cell(row, index) for index in range(len(row))):
+            continue
+        if columns is None:
+            columns = column_map(row, question_ids)
+            continue
+
+        try:
+            pending.append(parse_row(row, columns, question_ids, db.validate_email))
+        except ValueError as e:
+            summary['failed'] += 1
+            if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                summary['errors'].append((line, str(e)))
+            continue
+
+        if len(pending) >= chunk_size:
+            flush()
+
+    if columns is None:
+        raise ValueError('The file is empty')
+    if pending:
+        flush()
+    return summary
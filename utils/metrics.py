@@ -0,0 +1,343 @@
+import atexit
+import functools
+import glob
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, shared by request and query histograms
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metrics:
+    """Process-local counters and histograms, aggregated across workers.
+
+    Every process keeps its own values in memory and periodically writes
+    them to its own JSON file in `directory`. render() sums the files of
+    all workers into the Prometheus text format. When a worker exits,
+    mark_process_dead() folds its file into a shared archive file, so
+    counters never go backwards and the directory does not grow with every
+    restarted worker.
+    """
+
+    archive_file = 'metrics_archive.json'
+
+
+    flush_interval = 5
+
+    def __init__(self, directory=None):
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._descriptions = {}
+        self._pid = None
+        self._dead = []
+        self._merging = False
+        self._reset()
+
+    def _reset(self):
+        self._counters = {}
+        self._histograms = {}
+        self._pid = os.getpid()
+        # Unique per process lifetime, so a recycled PID never overwrites
+        # the totals of the worker that used it before
+        self._file = f'metrics_{self._pid}_{uuid.uuid4().hex[:8]}.json'
+        self._flusher = None
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            # Next to the database by default, shared by every worker
+            db_path = os.environ.get('DATABASE_PATH', 'data/assessment.db')
+            self._directory = os.environ.get(
+                'METRICS_DIR',
+                os.path.join(os.path.dirname(db_path) or '.', 'metrics'))
+        return self._directory
+
+    def describe(self, name, kind, help_text, buckets=DEFAULT_BUCKETS):
+        self._descriptions[name] = (kind, help_text, tuple(buckets))
+
+    def _ensure_process(self):
+        # Called with the lock held. A forked child starts from zero and
+        # writes its own file
+        if self._pid != os.getpid():
+            self._reset()
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop,
+                                             name='metrics-flush', daemon=True)
+            self._flusher.start()
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._ensure_process()
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        buckets = self._descriptions[name][2]
+        key = (name, tuple(labels))
+        with self._lock:
+            self._ensure_process()
+            # Per-bucket (non-cumulative) counts, then sum and count
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [0] * (len(buckets) + 2)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    entry[index] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write this process's values to its file in the metrics directory"""
+        with self._lock:
+            if self._pid != os.getpid() or not (self._counters or self._histograms):
+                return
+            snapshot = {
+                'counters': [[name, labels, value]
+                             for (name, labels), value in self._counters.items()],
+                'histograms': [[name, labels, values]
+                               for (name, labels), values in self._histograms.items()],
+            }
+            path = os.path.join(self.directory, self._file)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Metrics: could not write {path}: {e}")
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _merge(counters, histograms, snapshot):
+        for name, labels, value in snapshot.get('counters', []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot.get('histograms', []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            total = histograms.get(key)
+            if total is None or len(total) != len(values):
+                histograms[key] = list(values)
+            else:
+                histograms[key] = [a + b for a, b in zip(total, values)]
+
+    def collect(self):
+        """Sum the values written by every worker"""
+        self.flush()
+        counters = {}
+        histograms = {}
+        archive = self._load(os.path.join(self.directory, self.archive_file)) or {}
+        self._merge(counters, histograms, archive)
+        # Files already folded into the archive but not yet removed
+        merged = set(archive.get('merged', []))
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+            name = os.path.basename(path)
+            if name == self.archive_file or name in merged:
+                continue
+            snapshot = self._load(path)
+            if snapshot is not None:
+                self._merge(counters, histograms, snapshot)
+        return counters, histograms
+
+    def mark_process_dead(self, pid):
+        """Fold an exited worker's file into the archive and remove it.
+
+        Called from gunicorn's child_exit hook, which runs in the master's
+        SIGCHLD handler and can be re-entered while a merge is in progress;
+        nested calls only queue their PID, so merges never overlap. The
+        archive lists the files it already includes, so a concurrent
+        collect() never counts one twice.
+        """
+        self._dead.append(pid)
+        if self._merging:
+            return
+        self._merging = True
+        try:
+            while self._dead:
+                self._archive_process(self._dead.pop(0))
+        finally:
+            self._merging = False
+
+    def _archive_process(self, pid):
+        paths = glob.glob(os.path.join(self.directory, f'metrics_{pid}_*.json'))
+        if not paths:
+            return
+        archive_path = os.path.join(self.directory, self.archive_file)
+        archive = self._load(archive_path) or {}
+        counters, histograms = {}, {}
+        self._merge(counters, histograms, archive)
+        for path in paths:
+            snapshot = self._load(path)
+            if snapshot is not None:
+                self._merge(counters, histograms, snapshot)
+
+        merged = [os.path.basename(path) for path in paths]
+        # Names of files removed after an earlier merge are no longer needed
+        merged += [name for name in archive.get('merged', [])
+                   if os.path.exists(os.path.join(self.directory, name))]
+        snapshot = {
+            'counters': [[name, labels, value]
+                         for (name, labels), value in counters.items()],
+            'histograms': [[name, labels, values]
+                           for (name, labels), values in histograms.items()],
+            'merged': merged,
+        }
+        tmp_path = f'{archive_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, archive_path)
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in sorted(self._descriptions.items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, values):
+                    cumulative += count
+                    lines.append(f'{name}_bucket'
+                                 f'{_format_labels(labels, [("le", _format_value(bound))])}'
+                                 f' {_format_value(cumulative)}')
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])}'
+                             f' {_format_value(values[-1])}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(values[-2])}')
+                lines.append(f'{name}_count{_format_labels(labels)} {_format_value(values[-1])}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+atexit.register(metrics.flush)
+
+metrics.describe('http_request_duration_seconds', 'histogram',
+                 'Request latency by route, method and status')
+metrics.describe('db_query_duration_seconds', 'histogram',
+                 'Database method latency by name')
+metrics.describe('db_slow_queries_total', 'counter',
+                 'Database calls slower than SLOW_QUERY_MS')
+metrics.describe('db_query_errors_total', 'counter',
+                 'Database calls that raised')
+metrics.describe('db_connections_opened_total', 'counter',
+                 'SQLite connections opened')
+
+# Calls slower than this are logged and counted as slow
+SLOW_QUERY_SECONDS = float(os.environ.get('SLOW_QUERY_MS', 250)) / 1000
+# Each query is logged at most once per interval; the counter has them all
+SLOW_QUERY_LOG_INTERVAL = 60
+
+_slow_logged = {}
+
+
+def _record_query(name, elapsed, failed):
+    labels = (('query', name),)
+    metrics.observe('db_query_duration_seconds', elapsed, labels)
+    if failed:
+        metrics.inc('db_query_errors_total', labels)
+    if elapsed >= SLOW_QUERY_SECONDS:
+        metrics.inc('db_slow_queries_total', labels)
+        now = time.monotonic()
+        last, suppressed = _slow_logged.get(name, (None, 0))
+        if last is not None and now - last < SLOW_QUERY_LOG_INTERVAL:
+            _slow_logged[name] = (last, suppressed + 1)
+            return
+        _slow_logged[name] = (now, 0)
+        logger.warning("Slow query: %s took %.0f ms%s", name, elapsed * 1000,
+                       f" ({suppressed} more since the last report)" if suppressed else "")
+
+
+def timed_query(func):
+    """Time a Database method under its name. Generators are timed only
+    while they run (their execute/fetchmany calls), not while the consumer
+    works on what they yielded, and recorded once exhausted or closed."""
+    name = func.__name__
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            generator = func(*args, **kwargs)
+            elapsed = 0.0
+            failed = False
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    yield item
+            except Exception:
+                failed = True
+                raise
+            finally:
+                generator.close()
+                _record_query(name, elapsed, failed)
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            _record_query(name, time.perf_counter() - start, failed)
+    return wrapper
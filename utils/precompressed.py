@@ -0,0 +1,58 @@
+import gzip
+import hashlib
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Preferred first when the client accepts more than one
+ENCODINGS = ('br', 'gzip')
+
+
+def compress_variants(body):
+    """{encoding: bytes} for the identity body and every available encoding"""
+    variants = {'identity': body,
+                'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+def negotiate_encoding(accept_encodings, available):
+    """Best encoding in `available` that the Accept-Encoding header allows"""
+    for encoding in ENCODINGS:
+        if encoding in available and accept_encodings.quality(encoding) > 0:
+            return encoding
+    return 'identity'
+
+
+class PrecompressedPage:
+    """A response body compressed once and served from memory.
+
+    Each encoding gets its own strong ETag, since the bytes differ, and
+    responses vary on Accept-Encoding so shared caches keep them apart.
+    """
+
+    def __init__(self, body, mimetype='text/html'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.variants = compress_variants(body)
+
+    def respond(self, request):
+        encoding = negotiate_encoding(request.accept_encodings, self.variants)
+        response = Response(self.variants[encoding], mimetype=self.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+            response.set_etag(f'{self.etag}-{encoding}')
+        else:
+            response.set_etag(self.etag)
+        response.vary.add('Accept-Encoding')
+        # Identical for every visitor, but revalidated so a deploy shows up
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
@@ -0,0 +1,223 @@
+import csv
+import glob
+import io
+import multiprocessing
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from utils import charts
+from utils.scoring import scorer
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'templates')
+REPORT_TEMPLATE = 'report.html'
+INDEX_COLUMNS = ['file', 'first_name', 'last_name', 'email', 'primary_style',
+                 'secondary_style', 'adequacy_score', 'adequacy_level']
+# Finished archives are kept this long for downloading
+ARCHIVE_MAX_AGE = 24 * 3600
+
+# Per process; workers load the template once and reuse it for every chunk
+_environment = None
+
+
+def _template():
+    global _environment
+    if _environment is None:
+        from jinja2 import Environment, FileSystemLoader
+
+        _environment = Environment(loader=FileSystemLoader(TEMPLATE_DIR),
+                                   autoescape=True)
+    return _environment.get_template(REPORT_TEMPLATE)
+
+
+def _description(text):
+    """Split a scorer description into its heading and bullet points"""
+    lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
+    if not lines:
+        return {'title': '', 'points': []}
+    return {'title': lines[0],
+            'points': [line.lstrip('- ') for line in lines[1:]]}
+
+
+def report_filename(result):
+    """Stable ASCII file name: last-first-<id prefix>.html"""
+    name = f"{result['last_name']}-{result['first_name']}"
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    name = re.sub(r'[^A-Za-z0-9]+', '-', name).strip('-').lower() or 'participant'
+    return f"{name}-{str(result['user_id'])[:8]}.html"
+
+
+def render_report(result, generated_at):
+    """Standalone HTML report (inline CSS and SVG) for one result row"""
+    scores = charts.style_scores(result)
+    styles = [result['primary_style']]
+    if result['secondary_style'] and result['secondary_style'] != result['primary_style']:
+        styles.append(result['secondary_style'])
+    return _template().render(
+        result=result,
+        scores=list(zip(charts.STYLE_LABELS, scores)),
+        chart=charts.donut_chart(charts.STYLE_LABELS, scores,
+                                 title='Distribuția procentuală a stilurilor'),
+        style_descriptions=[(style, _description(scorer.get_style_description(style)))
+                            for style in styles],
+        adequacy_description=_description(
+            scorer.get_adequacy_description(result['adequacy_score'] or 0)),
+        generated_at=generated_at)
+
+
+def render_chunk(rows, generated_at):
+    """[(file name, encoded report)] for a chunk of rows; runs in the pool"""
+    return [(report_filename(row), render_report(row, generated_at).encode('utf-8'))
+            for row in rows]
+
+
+def generate_reports(db, path, user_ids=None, filters=None, processes=None,
+                     chunk_size=100, progress=None):
+    """Render one report per selected participant into a single zip archive.
+
+    Chunks of rows are rendered in a process pool while this process reads
+    the next chunks and writes finished ones to the archive. At most two
+    chunks per process are in flight, so memory use does not grow with the
+    cohort. The archive also holds an index.csv listing every report.
+    Returns the number of reports written.
+    """
+    processes = processes or os.cpu_count() or 1
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    chunks = db.iter_report_rows(user_ids=user_ids, chunk_size=chunk_size,
+                                 **(filters or {}))
+
+    index = io.StringIO()
+    index_writer = csv.writer(index, lineterminator='\n')
+    index_writer.writerow(INDEX_COLUMNS)
+    written = 0
+
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            def store(reports):
+                nonlocal written
+                for name, body in reports:
+                    archive.writestr(name, body)
+                written += len(reports)
+                if progress:
+                    progress(written)
+
+            if processes == 1:
+                for rows in chunks:
+                    index_writer.writerows(_index_rows(rows))
+                    store(render_chunk(rows, generated_at))
+            else:
+                # spawn: forking a threaded server process is not safe
+                with ProcessPoolExecutor(
+                        max_workers=processes,
+                        mp_context=multiprocessing.get_context('spawn')) as pool:
+                    pending = set()
+                    for rows in chunks:
+                        index_writer.writerows(_index_rows(rows))
+                        pending.add(pool.submit(render_chunk, rows, generated_at))
+                        if len(pending) >= processes * 2:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                store(future.result())
+                    for future in pending:
+                        store(future.result())
+
+            archive.writestr('index.csv', index.getvalue().encode('utf-8'))
+        os.replace(tmp_path, path)
+    finally:
+        chunks.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return written
+
+
+def _index_rows(rows):
+    return [[report_filename(row)] + [row[column] for column in INDEX_COLUMNS[1:]]
+            for row in rows]
+
+
+class ReportJobs:
+    """Generate report archives off the request thread.
+
+    Job state is kept in the export_jobs table, so the export status and
+    download endpoints serve report jobs too. Each job renders in its own
+    process pool; archives and job rows older than ARCHIVE_MAX_AGE are
+    removed when a new job starts. Rows come from `read_db()` when given, as in ExportJobs.
+    """
+
+    max_workers = 1
+
+    def __init__(self, db, output_dir=None, processes=None, read_db=None):
+        self.db = db
+        self._read_db = read_db or (lambda: db)
+        self._output_dir = output_dir
+        self.processes = processes
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def output_dir(self):
+        if self._output_dir is None:
+            self._output_dir = os.environ.get(
+                'REPORTS_DIR',
+                os.path.join(os.path.dirname(self.db.db_path) or '.', 'reports'))
+        return self._output_dir
+
+    def _executor_for_process(self):
+        # Created lazily so each forked gunicorn worker gets its own thread
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='reports')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _remove_expired(self):
+        self.db.purge_export_jobs(ARCHIVE_MAX_AGE)
+        cutoff = time.time() - ARCHIVE_MAX_AGE
+        for old in glob.glob(os.path.join(self.output_dir, 'reports_*.zip')):
+            try:
+                if os.path.getmtime(old) < cutoff:
+                    os.remove(old)
+            except OSError:
+                pass
+
+    def start(self, user_ids=None, filters=None):
+        """Queue a report archive and return its job ID"""
+        job_id = str(uuid.uuid4())
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._remove_expired()
+        self.db.create_export_job(job_id)
+        self._executor_for_process().submit(self._run, job_id, user_ids, filters or {})
+        return job_id
+
+    def _run(self, job_id, user_ids, filters):
+        try:
+            source = self._read_db()
+            if user_ids is None:
+                total = source.count_export_rows(**filters)
+            else:
+                total = len(set(map(str, user_ids)))
+            self.db.update_export_job(job_id, status='running', total=total)
+            path = os.path.join(self.output_dir, f'reports_{job_id}.zip')
+            written = generate_reports(
+                source, path, user_ids=user_ids, filters=filters,
+                processes=self.processes,
+                progress=lambda done: self.db.update_export_job(job_id, progress=done))
+            # Unknown IDs are skipped, so the final count can be lower
+            self.db.update_export_job(job_id,
+                                      status='done',
+                                      progress=written,
+                                      total=written,
+                                      file_path=path)
+        except Exception as e:
+            self.db.update_export_job(job_id, status='failed', error=str(e))
@@ -1,58 +1,133 @@
 from typing import List, Dict, Tuple
 
+# Style mapping from test metadata
+STYLE_MAPPING = {
+    "1": [
+        "1A", "2D", "3C", "4B", "5C", "6B", "7A", "8C", "9C", "10B", "11A",
+        "12C"
+    ],  # Stil 1 (Directiv)
+    "2": [
+        "1C", "2A", "3A", "4D", "5B", "6D", "7C", "8B", "9B", "10D", "11C",
+        "12A"
+    ],  # Stil 2 (Persuasiv)
+    "3": [
+        "1B", "2C", "3D", "4A", "5D", "6A", "7B", "8D", "9D", "10A", "11B",
+        "12D"
+    ],  # Stil 3 (Participativ)
+    "4": [
+        "1D", "2B", "3B", "4C", "5A", "6C", "7D", "8A", "9A", "10C", "11D",
+        "12B"
+    ]  # Stil 4 (Delegativ)
+}
+
+# Adequacy mapping from test metadata
+ADEQUACY_MAPPING = {
+    "answers": {
+        "a": [
+            "1D", "2B", "3C", "4B", "5A", "6C", "7A", "8C", "9A", "10B",
+            "11A", "12C"
+        ],
+        "b": [
+            "1B", "2D", "3B", "4D", "5D", "6A", "7C", "8B", "9D", "10C",
+            "11C", "12A"
+        ],
+        "c": [
+            "1C", "2C", "3A", "4A", "5B", "6B", "7D", "8D", "9B", "10A",
+            "11D", "12D"
+        ],
+        "d": [
+            "1A", "2A", "3D", "4C", "5C", "6D", "7B", "8A", "9C", "10D",
+            "11B", "12B"
+        ]
+    }
+}
+
+ADEQUACY_COEFFICIENTS = {"a": -2, "b": -1, "c": 1, "d": 2}
+
+STYLE_NAMES = {
+    "1": "Directiv",
+    "2": "Informativ",
+    "3": "Participativ",
+    "4": "Delegativ"
+}
+
+# Style keys in tie-break order (lowest key wins a tie)
+STYLE_KEYS = tuple(sorted(STYLE_MAPPING.keys()))
+
+
+def _split_answer_key(answer_key: str) -> Tuple[str, str]:
+    return answer_key[:-1], answer_key[-1]
+
+
+def _compile_style_table() -> Dict[Tuple[str, str], Tuple[int, ...]]:
+    table = {}
+    for index, style in enumerate(STYLE_KEYS):
+        for answer_key in STYLE_MAPPING[style]:
+            key = _split_answer_key(answer_key)
+            table[key] = table.get(key, ()) + (index, )
+    return table
+
+
+def _compile_adequacy_table() -> Dict[Tuple[str, str], int]:
+    table = {}
+    for category, answers in ADEQUACY_MAPPING["answers"].items():
+        for answer_key in answers:
+            # First matching category wins, as in calculate_adequacy_score
+            table.setdefault(_split_answer_key(answer_key),
+                             ADEQUACY_COEFFICIENTS[category])
+    return table
+
+
+# (question, answer) -> style indices / adequacy coefficient, built once
+STYLE_TABLE = _compile_style_table()
+ADEQUACY_TABLE = _compile_adequacy_table()
+
+
+def adequacy_level(total_score: int) -> str:
+    if total_score >= 20 and total_score <= 24:
+        return "Excelent"
+    elif total_score >= 10 and total_score <= 19:
+        return "Bun"
+    # -24 to 9
+    return "Necesită dezvoltare"
+
 
 class AssessmentScorer:
 
     def __init__(self):
-        # Style mapping from test metadata
-        self.style_mapping = {
-            "1": [
-                "1A", "2D", "3C", "4B", "5C", "6B", "7A", "8C", "9C", "10B",
-                "11A", "12C"
-            ],  # Stil 1 (Directiv)
-            "2": [
-                "1C", "2A", "3A", "4D", "5B", "6D", "7C", "8B", "9B", "10D",
-                "11C", "12A"
-            ],  # Stil 2 (Persuasiv)
-            "3": [
-                "1B", "2C", "3D", "4A", "5D", "6A", "7B", "8D", "9D", "10A",
-                "11B", "12D"
-            ],  # Stil 3 (Participativ)
-            "4": [
-                "1D", "2B", "3B", "4C", "5A", "6C", "7D", "8A", "9A", "10C",
-                "11D", "12B"
-            ]  # Stil 4 (Delegativ)
-        }
+        self.style_mapping = STYLE_MAPPING
+        self.adequacy_mapping = ADEQUACY_MAPPING
+        self.adequacy_coefficients = ADEQUACY_COEFFICIENTS
+        self.style_names = STYLE_NAMES
 
-        # Adequacy mapping from test metadata
-        self.adequacy_mapping = {
-            "answers": {
-                "a": [
-                    "1D", "2B", "3C", "4B", "5A", "6C", "7A", "8C", "9A",
-                    "10B", "11A", "12C"
-                ],
-                "b": [
-                    "1B", "2D", "3B", "4D", "5D", "6A", "7C", "8B", "9D",
-                    "10C", "11C", "12A"
-                ],
-                "c": [
-                    "1C", "2C", "3A", "4A", "5B", "6B", "7D", "8D", "9B",
-                    "10A", "11D", "12D"
-                ],
-                "d": [
-                    "1A", "2A", "3D", "4C", "5C", "6D", "7B", "8A", "9C",
-                    "10D", "11B", "12B"
-                ]
-            }
-        }
+    def score(self, responses: Dict[int, str]) -> Dict:
+        """Score a response set in one pass over the compiled lookup tables.
 
-        self.adequacy_coefficients = {"a": -2, "b": -1, "c": 1, "d": 2}
+        Returns primary/secondary style, the four style scores, and the
+        adequacy score and level, matching calculate_style_scores,
+        get_all_style_scores and calculate_adequacy_score.
+        """
+        counts = [0] * len(STYLE_KEYS)
+        total_score = 0
 
-        self.style_names = {
-            "1": "Directiv",
-            "2": "Informativ",
-            "3": "Participativ",
-            "4": "Delegativ"
+        for question, answer in responses.items():
+            key = (str(question), answer)
+            for index in STYLE_TABLE.get(key, ()):
+                counts[index] += 1
+            total_score += ADEQUACY_TABLE.get(key, 0)
+
+        ranked = sorted(range(len(STYLE_KEYS)),
+                        key=lambda i: (-counts[i], STYLE_KEYS[i]))
+
+        return {
+            "primary_style": STYLE_NAMES[STYLE_KEYS[ranked[0]]],
+            "secondary_style": STYLE_NAMES[STYLE_KEYS[ranked[1]]],
+            "style_scores": {
+                STYLE_NAMES[style]: counts[i]
+                for i, style in enumerate(STYLE_KEYS)
+            },
+            "adequacy_score": total_score,
+            "adequacy_level": adequacy_level(total_score)
         }
 
     def calculate_style_scores(self, responses: Dict[int,
@@ -109,12 +184,7 @@ class AssessmentScorer:
                     break
 
         # Determine adequacy level based on updated score ranges
-        if total_score >= 20 and total_score <= 24:
-            level = "Excelent"
-        elif total_score >= 10 and total_score <= 19:
-            level = "Bun"
-        else:  # -24 to 9
-            level = "Necesită dezvoltare"
+        level = adequacy_level(total_score)
 
         return int(total_score), level
 
@@ -196,3 +266,7 @@ Stil orientat spre autonomie și împuternicire, caracterizat prin:
     - Eficacitate foarte scăzută în majoritatea contextelor
     - Necesitate urgentă de dezvoltare a competențelor fundamentale de leadership
             """
+
+
+# Shared instance; the scorer holds no per-request state
+scorer = AssessmentScorer()
@@ -0,0 +1,104 @@
+import secrets
+import time
+from datetime import timedelta
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session whose data lives in the database; the cookie only holds its ID"""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=0):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+        # Stored ID replaced by regenerate(), deleted when the session is saved
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Move the data to a fresh ID, e.g. on login, so an ID known
+        before the privilege change cannot be used after it"""
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+class SqliteSessionInterface(SessionInterface):
+    """Store sessions in the shared SQLite database.
+
+    Every gunicorn worker reads the same sessions table, so a participant
+    can be served by any worker. Rows expire after
+    PERMANENT_SESSION_LIFETIME and are purged periodically.
+    """
+
+    serializer = TaggedJSONSerializer()
+    # Seconds between purges of expired rows, per process
+    purge_interval = 300
+
+    def __init__(self, db):
+        self.db = db
+        self._last_purge = 0
+
+    def _lifetime(self, app):
+        lifetime = app.permanent_session_lifetime
+        if isinstance(lifetime, timedelta):
+            return int(lifetime.total_seconds())
+        return int(lifetime)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self.db.get_session(sid, int(time.time()))
+            if row is not None:
+                data, expires_at = row
+                return ServerSideSession(self.serializer.loads(data),
+                                         sid=sid,
+                                         expires_at=expires_at)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        now = int(time.time())
+
+        if session.previous_sid is not None:
+            self.db.delete_session(session.previous_sid)
+            session.previous_sid = None
+
+        if not session:
+            if session.modified and not session.new:
+                self.db.delete_session(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = self._lifetime(app)
+        # Only slide the expiry once half the lifetime has passed, so
+        # unchanged sessions don't cost a write on every request
+        refresh = session.expires_at - now < lifetime // 2
+        if not (session.modified or session.new or refresh):
+            return
+
+        expires_at = now + lifetime
+        self.db.save_session(session.sid, self.serializer.dumps(dict(session)),
+                             expires_at)
+        response.set_cookie(name,
+                            session.sid,
+                            expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app),
+                            domain=domain,
+                            path=path,
+                            secure=self.get_cookie_secure(app),
+                            samesite=self.get_cookie_samesite(app))
+
+        if now - self._last_purge > self.purge_interval:
+            self._last_purge = now
+            self.db.purge_expired_sessions(now)
@@ -0,0 +1,143 @@
+import glob
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import abort, send_from_directory
+
+from utils.precompressed import compress_variants, negotiate_encoding
+
+# Build output, relative to the static folder
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+# Source files (relative to the static folder) run through the pipeline
+ASSET_PATTERNS = ('css/*.css', 'js/*.js')
+# Fingerprinted files never change under the same name
+IMMUTABLE_MAX_AGE = 31536000
+
+_CSS_STRING_OR_COMMENT = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+_CSS_STRING = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+
+
+def minify_css(source):
+    """Drop comments and redundant whitespace, leaving strings untouched"""
+    source = _CSS_STRING_OR_COMMENT.sub(lambda m: m.group(1) or '', source)
+    parts = _CSS_STRING.split(source)
+    for index in range(0, len(parts), 2):
+        text = re.sub(r'\s+', ' ', parts[index])
+        text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+        text = re.sub(r':\s+', ':', text)
+        parts[index] = text.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def minify_js(source):
+    """Conservative JS minification: indentation, blank lines and whole-line
+    // comments go; line breaks stay, so automatic semicolons are unaffected"""
+    lines = []
+    for line in source.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build_assets(static_folder):
+    """Minify, fingerprint and precompress the static assets.
+
+    Writes dist/<dir>/<name>.<hash>.<ext> plus .gz/.br siblings and a
+    manifest mapping source names to built ones. Returns the manifest.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    written = set()
+
+    for pattern in ASSET_PATTERNS:
+        for path in sorted(glob.glob(os.path.join(static_folder, pattern))):
+            name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            stem, ext = os.path.splitext(name)
+            with open(path, encoding='utf-8') as f:
+                body = MINIFIERS[ext](f.read()).encode('utf-8')
+
+            digest = hashlib.sha256(body).hexdigest()[:10]
+            built = f'{DIST_DIR}/{stem}.{digest}{ext}'
+            target = os.path.join(static_folder, built)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+
+            for encoding, data in compress_variants(body).items():
+                out = target + {'identity': '', 'gzip': '.gz', 'br': '.br'}[encoding]
+                with open(out, 'wb') as f:
+                    f.write(data)
+                written.add(os.path.abspath(out))
+            manifest[name] = built
+
+    # Remove outputs of earlier builds
+    for path in glob.glob(os.path.join(dist, '**', '*'), recursive=True):
+        if os.path.isfile(path) and os.path.abspath(path) not in written \
+                and os.path.basename(path) != MANIFEST_NAME:
+            os.remove(path)
+
+    os.makedirs(dist, exist_ok=True)
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """Resolve source asset names to their fingerprinted build.
+
+    Without a build (e.g. in development) names resolve to themselves, so
+    templates work either way. In debug mode the manifest is re-read on
+    every lookup so a rebuild is picked up without a restart.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._manifest = None
+
+    def _load(self):
+        path = os.path.join(self.app.static_folder, DIST_DIR, MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def resolve(self, filename):
+        if self._manifest is None or self.app.debug:
+            self._manifest = self._load()
+        return self._manifest.get(filename, filename)
+
+
+def send_built_asset(static_folder, filename, request):
+    """Response for a fingerprinted file, precompressed when accepted"""
+    directory = os.path.join(static_folder, DIST_DIR)
+    available = {'identity': filename}
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if os.path.isfile(os.path.join(directory, filename + suffix)):
+            available[encoding] = filename + suffix
+    encoding = negotiate_encoding(request.accept_encodings, available)
+
+    mimetype = mimetypes.guess_type(filename)[0]
+    if mimetype is None:
+        abort(404)
+    # The manifest keeps its name across builds, so it must be revalidated
+    fingerprinted = filename != MANIFEST_NAME
+    response = send_from_directory(directory, available[encoding],
+                                   mimetype=mimetype,
+                                   max_age=IMMUTABLE_MAX_AGE if fingerprinted else None)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    if fingerprinted:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
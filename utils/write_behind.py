@@ -0,0 +1,187 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+# Queue item telling the writer thread to commit what it has and exit
+_STOP = object()
+
+
+class _Flush:
+    """Queue marker; set once every row queued before it is committed"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class ResponseWriter:
+    """Write-behind queue for participant answers.
+
+    Requests enqueue their answers and return immediately; one writer thread
+    per process drains the queue and commits rows from many participants
+    together, every batch_size rows or interval seconds, whichever comes
+    first. flush() blocks until everything queued so far is committed, and
+    the queue is flushed when the process exits.
+
+    A batch that fails is retried with the next one, or after retry_interval
+    seconds if nothing else arrives, up to max_retries times; after that its
+    rows are saved one at a time and any row that still fails is dropped and
+    logged, so one bad row cannot hold up the rest.
+    """
+
+    def __init__(self, db, batch_size=200, interval=0.02, flush_timeout=10,
+                 max_retries=3, retry_interval=1.0):
+        self.db = db
+        self.batch_size = batch_size
+        self.interval = interval
+        self.flush_timeout = flush_timeout
+        self.max_retries = max_retries
+        self.retry_interval = retry_interval
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Rows queued in this process and not yet committed or dropped, per user
+        self._unsaved = Counter()
+        atexit.register(self.close)
+
+    def _queue_for_process(self):
+        # Started lazily so each forked gunicorn worker gets its own thread
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._unsaved = Counter()
+                self._thread = threading.Thread(target=self._run,
+                                                args=(self._queue,),
+                                                name='response-writer',
+                                                daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def _running_queue(self):
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                return None
+            return self._queue
+
+    def submit(self, user_id, question_id, answer):
+        self.submit_many(user_id, [(question_id, answer)])
+
+    def submit_many(self, user_id, answers):
+        """Queue (question_id, answer) pairs; they are committed together"""
+        rows = [(str(user_id), question_id, answer)
+                for question_id, answer in answers]
+        if rows:
+            pending = self._queue_for_process()
+            with self._lock:
+                self._unsaved[str(user_id)] += len(rows)
+            pending.put(rows)
+
+    def unsaved(self, user_id):
+        """Answers from user_id queued in this process but not yet committed"""
+        with self._lock:
+            return self._unsaved[str(user_id)]
+
+    def _settled(self, rows):
+        """Rows left the queue: committed, or dropped after their retries"""
+        with self._lock:
+            for user_id, _, _ in rows:
+                self._unsaved[user_id] -= 1
+                if self._unsaved[user_id] <= 0:
+                    del self._unsaved[user_id]
+
+    def flush(self, timeout=None):
+        """Block until every answer queued so far in this process is committed.
+
+        Raises the last write error if the rows could not be saved, or
+        TimeoutError if the writer does not catch up in time.
+        """
+        pending = self._running_queue()
+        if pending is None:
+            return
+        marker = _Flush()
+        pending.put(marker)
+        if not marker.done.wait(timeout or self.flush_timeout):
+            raise TimeoutError('Timed out waiting for queued answers to be saved')
+        if marker.error is not None:
+            raise marker.error
+
+    def close(self):
+        """Commit anything still queued and stop the writer thread"""
+        pending = self._running_queue()
+        if pending is None or not self._thread.is_alive():
+            return
+        pending.put(_STOP)
+        self._thread.join(self.flush_timeout)
+
+    def _save_each(self, rows):
+        """Save rows one at a time, dropping those that fail; last error or None"""
+        error = None
+        for row in rows:
+            try:
+                self.db.save_response_batch([row])
+            except Exception as e:
+                error = e
+                print(f"❌ Response writer: dropped answer {row}: {e}")
+        return error
+
+    def _run(self, pending):
+        # Rows from a failed commit are kept and retried with the next batch,
+        # or after retry_interval when the queue stays empty
+        rows = []
+        failures = 0
+        stopping = False
+        while not stopping:
+            try:
+                # With failed rows waiting, retry them even if nothing arrives
+                item = pending.get(timeout=self.retry_interval if rows else None)
+            except queue.Empty:
+                item = None
+            waiters = []
+            deadline = time.monotonic() + self.interval
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                    break
+                if isinstance(item, _Flush):
+                    waiters.append(item)
+                    break
+                rows.extend(item)
+                if len(rows) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            error = None
+            if rows:
+                try:
+                    self.db.save_response_batch(rows)
+                    self._settled(rows)
+                    rows = []
+                    failures = 0
+                except Exception as e:
+                    error = e
+                    failures += 1
+                    if failures >= self.max_retries or stopping:
+                        print(f"⚠️  Response writer: could not save {len(rows)} answers "
+                              f"after {failures} attempts, saving them one by one: {e}")
+                        error = self._save_each(rows)
+                        self._settled(rows)
+                        rows = []
+                        failures = 0
+                    else:
+                        print(f"⚠️  Response writer: could not save {len(rows)} answers, "
+                              f"will retry: {e}")
+
+            for waiter in waiters:
+                waiter.error = error
+                waiter.done.set()